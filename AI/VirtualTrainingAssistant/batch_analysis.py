@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Headless rep counting and form reports for recorded workout sets.
+
+Frames are streamed from each video as a generator and run through the pose
+model in batches. The whole batch's joint angles are computed in one
+vectorized pass, then fed frame by frame through the same rep state machine
+and form rules as the live trainer. Files are processed in parallel, one
+model per worker process. The backend is chosen, exported and checked once
+in the parent before the workers start, so they do not race to export it. A
+video that fails is reported and skipped; the other videos' reps are still
+written.
+
+The result is one row per rep: video, exercise, rep number, start and end
+time, range of the tracked angle and the form feedback given during the rep
+(the first warning, otherwise the last tip). It is written as a compressed
+NumPy archive of columns (.npz) or as CSV.
+
+Videos can be listed directly with --exercise, or given as directories with
+one subdirectory per exercise (as for quant_benchmark.py).
+
+Usage:
+    python batch_analysis.py uploads/set1.mp4 uploads/set2.mp4 --exercise "Left Dumbbell"
+    python batch_analysis.py recordings --output reps.csv --workers 4
+"""
+import argparse
+import csv
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import islice
+
+import cv2
+import numpy as np
+
+import settings
+from exercises import EXERCISE_REGISTRY, EXERCISES
+from inference_server import first_person_keypoints
+from model_registry import DEFAULT_MODEL_PATH, get_pose_model
+from pose_backends import load_pose_model
+from quant_benchmark import find_recordings
+from quantization import VIDEO_EXTENSIONS
+
+# Output columns and their dtypes in the .npz archive
+COLUMNS = {
+    "video": str,
+    "exercise": str,
+    "rep": np.int32,
+    "start_s": np.float32,
+    "end_s": np.float32,
+    "min_angle": np.float32,
+    "max_angle": np.float32,
+    "feedback": str,
+    "feedback_type": str,
+}
+
+_model_path = DEFAULT_MODEL_PATH
+_backend = (settings.POSE_BACKEND, settings.POSE_PRECISION)
+
+
+def video_frames(path, stride=1):
+    """Yield (timestamp in seconds, BGR frame) for every stride-th frame of a video"""
+    capture = cv2.VideoCapture(path)
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+        index = 0
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            if index % stride == 0:
+                yield index / fps, frame
+            index += 1
+    finally:
+        capture.release()
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def batch_keypoints(model, frames, imgsz=settings.INFERENCE_SIZE):
+    """Run a batch of frames through the model; returns (N, 17, 3) keypoints, NaN where nobody was found"""
+    keypoints = np.full((len(frames), 17, 3), np.nan)
+    for i, result in enumerate(model(frames, imgsz=imgsz)):
+        person = first_person_keypoints(result)
+        if person is not None and len(person) >= 10:
+            keypoints[i, :len(person)] = person
+    return keypoints
+
+
+class RepTracker:
+    """Rep state machine over a stream of frame features, recording each completed rep"""
+
+    def __init__(self, exercise):
+        self.exercise = exercise
+        self.counter = 0
+        self.direction = "up"
+        self.reps = []
+        self._start = None
+        self._angles = []
+        self._warning = None
+        self._tip = ("", "good")
+
+    def update(self, timestamp, features):
+        if not self.exercise.visible(features):
+            return  # the person is out of view or not detected in this frame
+        if self._start is None:
+            self._start = timestamp
+        angle, self.counter, self.direction = self.exercise.count_rep(features, self.counter, self.direction)
+        self._angles.append(angle)
+        feedback, feedback_type = self.exercise.check_form(features, self.direction)
+        if feedback_type == "bad" and self._warning is None:
+            self._warning = (feedback, feedback_type)
+        elif feedback:
+            self._tip = (feedback, feedback_type)
+
+        if self.counter > len(self.reps):
+            feedback, feedback_type = self._warning or self._tip
+            self.reps.append((self.counter, self._start, timestamp,
+                              min(self._angles), max(self._angles), feedback, feedback_type))
+            self._start, self._angles, self._warning = timestamp, [], None
+
+
+def analyze_video(path, app_mode, batch_size=settings.MAX_BATCH_SIZE, stride=1):
+    """Count reps in one video; returns its rows as tuples in COLUMNS order"""
+    model = get_pose_model(_model_path, *_backend)
+    exercise = EXERCISE_REGISTRY[app_mode]
+    tracker = RepTracker(exercise)
+    smoother = exercise.smoother()
+    for batch in batches(video_frames(path, stride), batch_size):
+        timestamps, frames = zip(*batch)
+        keypoints = batch_keypoints(model, list(frames))
+        detected = ~np.isnan(keypoints[:, 0, 0])
+        if smoother is not None:
+            # The filter is sequential, but cheap next to the batched model call
+            for i, timestamp in enumerate(timestamps):
+                smoothed = smoother(keypoints[i] if detected[i] else None, timestamp)
+                if smoothed is not None:
+                    keypoints[i] = smoothed
+        # One vectorized pass over the batch, then the sequential state machine per frame
+        features = exercise.features(np.nan_to_num(keypoints))
+        for i in np.flatnonzero(detected):
+            tracker.update(timestamps[i], {name: values[i] for name, values in features.items()})
+    return [(path, app_mode) + rep for rep in tracker.reps]
+
+
+def resolve_backend(model_path):
+    """Pick, export and check the pose backend once; returns (backend, precision) for the workers"""
+    _, label = load_pose_model(model_path)
+    backend, _, precision = label.partition("/")
+    return backend, precision or "fp32"
+
+
+def _init_worker(model_path, backend, threads):
+    global _model_path, _backend
+    _model_path = model_path
+    _backend = backend
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+
+def _analyze_job(job):
+    return analyze_video(*job)
+
+
+def collect_jobs(paths, app_mode):
+    """List (video, exercise) pairs from video files and per-exercise directories"""
+    jobs = []
+    for path in paths:
+        if os.path.isdir(path):
+            jobs.extend((video, mode) for mode, videos in find_recordings(path).items() for video in videos)
+        elif path.lower().endswith(VIDEO_EXTENSIONS):
+            if app_mode is None:
+                raise ValueError(f"--exercise is required for {path}")
+            jobs.append((path, app_mode))
+        else:
+            raise ValueError(f"not a video file or directory: {path}")
+    return jobs
+
+
+def write_columns(rows, path):
+    """Write rows as named columns to .npz (compressed arrays) or .csv"""
+    if path.lower().endswith(".csv"):
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(COLUMNS)
+            writer.writerows(rows)
+        return
+    columns = list(zip(*rows)) if rows else [()] * len(COLUMNS)
+    arrays = {name: np.array(values, dtype=dtype) for (name, dtype), values in zip(COLUMNS.items(), columns)}
+    np.savez_compressed(path, **arrays)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("videos", nargs="+", help="video files or directories of per-exercise recordings")
+    parser.add_argument("--exercise", choices=EXERCISES, help="exercise performed in the listed video files")
+    parser.add_argument("--output", default="reps.npz", help="output file, .npz or .csv")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="parallel worker processes")
+    parser.add_argument("--batch-size", type=int, default=settings.MAX_BATCH_SIZE, help="frames per model call")
+    parser.add_argument("--stride", type=int, default=1, help="analyze every Nth frame")
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH)
+    args = parser.parse_args()
+
+    try:
+        jobs = collect_jobs(args.videos, args.exercise)
+    except ValueError as exc:
+        parser.error(str(exc))
+    if not jobs:
+        parser.error("no videos found")
+
+    workers = max(1, min(args.workers, len(jobs)))
+    # Split the cores between the workers instead of every worker using all of them
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    backend = resolve_backend(args.model)
+    print(f"Pose model on {'/'.join(backend)}")
+
+    results, failed = {}, []
+    # Spawned workers each load their own model instead of inheriting the parent's threads
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                             initargs=(args.model, backend, threads)) as pool:
+        futures = {pool.submit(_analyze_job, (video, app_mode, args.batch_size, args.stride)): i
+                   for i, (video, app_mode) in enumerate(jobs)}
+        for future in as_completed(futures):
+            video, app_mode = jobs[futures[future]]
+            try:
+                results[futures[future]] = reps = future.result()
+            except Exception as exc:
+                failed.append(video)
+                print(f"{video}: failed: {exc!r}", file=sys.stderr)
+                continue
+            print(f"{video}: {len(reps)} reps of {app_mode}")
+
+    # Rows in the order the videos were given, whatever order they finished in
+    rows = [rep for i in sorted(results) for rep in results[i]]
+    write_columns(rows, args.output)
+    print(f"{len(rows)} reps from {len(results)} videos written to {args.output}")
+    if failed:
+        print(f"{len(failed)} videos failed: {', '.join(failed)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
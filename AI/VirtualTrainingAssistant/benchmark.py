@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Offline performance benchmark for the live trainer's frame processing.
+
+Replays recorded videos or synthetic frames through VideoProcessor.recv,
+the same code path a WebRTC session uses, without a browser. Every run
+reports FPS, p50/p95/p99 per-frame latency, memory and the rep count,
+broken down by exercise, source, resolution and backend. Memory is the
+resident set size sampled after every frame of the run: its peak, and how far
+it grew over the RSS at the start of the run, so each run is measured on its
+own rather than against the peak of every run before it. Results are
+written as JSON; pass a previous results file with --baseline to flag
+regressions.
+
+Sources are video files, or directories with one subdirectory of videos per
+exercise (as for quant_benchmark.py). Loose files are replayed for every
+exercise given with --exercises. Synthetic frames contain no person, so they
+measure the per-frame overhead rather than rep counting.
+
+VTA_PIPELINE=1 is refused: recv then returns after at most PIPELINE_WAIT_MS
+with whatever frame has finished, so its latency says nothing about the frame
+just submitted.
+
+Usage:
+    python benchmark.py recordings --backends pytorch onnx --resolutions 640x480 1280x720
+    python benchmark.py --synthetic 300 --exercises "Left Dumbbell" --baseline benchmark.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from fractions import Fraction
+
+import av
+import cv2
+import numpy as np
+
+import settings
+from exercises import EXERCISES
+from inference_server import InferenceScheduler
+from model_registry import DEFAULT_MODEL_PATH, SharedPoseModel, resident_memory_mb
+from pose_backends import load_backend
+from quant_benchmark import find_recordings
+from quantization import VIDEO_EXTENSIONS, read_video_frames
+from video_processor import VideoProcessor
+
+SYNTHETIC = "synthetic"
+TIME_BASE = Fraction(1, 30)
+
+# Metrics compared against a baseline and whether higher values are better
+REGRESSION_METRICS = {"fps": True, "p50_ms": False, "p95_ms": False, "p99_ms": False}
+
+
+def parse_resolution(value):
+    width, _, height = value.lower().partition("x")
+    try:
+        return int(width), int(height)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got {value!r}")
+
+
+def synthetic_frames(count, width=640, height=480, seed=0):
+    """Yield count noise frames, drifting so consecutive frames differ"""
+    rng = np.random.default_rng(seed)
+    base = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+    for index in range(count):
+        yield np.roll(base, index * 4, axis=1)
+
+
+def collect_sources(paths, exercises, synthetic):
+    """List (app_mode, source, frame factory) for every run"""
+    sources = []
+    for path in paths:
+        if os.path.isdir(path):
+            for app_mode, videos in find_recordings(path).items():
+                if app_mode in exercises:
+                    sources.extend((app_mode, video, lambda video=video: read_video_frames(video))
+                                   for video in videos)
+        elif path.lower().endswith(VIDEO_EXTENSIONS):
+            sources.extend((app_mode, path, lambda path=path: read_video_frames(path))
+                           for app_mode in exercises)
+        else:
+            raise ValueError(f"not a video file or directory: {path}")
+    if synthetic:
+        sources.extend((app_mode, SYNTHETIC, lambda: synthetic_frames(synthetic)) for app_mode in exercises)
+    return sources
+
+
+def run(scheduler, app_mode, frames, resolution=None, max_frames=None):
+    """Replay frames through a fresh VideoProcessor and time every recv call"""
+    processor = VideoProcessor(app_mode, scheduler)
+    latencies = []
+    rss_start = resident_memory_mb()
+    rss_peak = rss_start
+    try:
+        for index, img in enumerate(frames):
+            if max_frames is not None and index >= max_frames:
+                break
+            if resolution is not None and (img.shape[1], img.shape[0]) != resolution:
+                img = cv2.resize(img, resolution, interpolation=cv2.INTER_AREA)
+            frame = av.VideoFrame.from_ndarray(img, format="bgr24")
+            frame.pts, frame.time_base = index, TIME_BASE
+
+            start = time.perf_counter()
+            processor.recv(frame)
+            latencies.append(time.perf_counter() - start)
+            rss = resident_memory_mb()
+            if rss is not None:
+                rss_peak = max(rss_peak, rss)
+    finally:
+        processor.on_ended()
+
+    latencies_ms = np.array(latencies) * 1000
+    if not len(latencies_ms):
+        return None
+    return {
+        "frames": len(latencies_ms),
+        "fps": float(len(latencies_ms) / latencies_ms.sum() * 1000),
+        "mean_ms": float(latencies_ms.mean()),
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "peak_rss_mb": rss_peak,
+        "rss_growth_mb": rss_peak - rss_start if rss_start is not None else None,
+        "reps": processor.counter,
+    }
+
+
+def _mb(value):
+    return "n/a" if value is None else f"{value:.0f}"
+
+
+def run_key(result):
+    return (result["exercise"], result["source"], result["resolution"], result["backend"])
+
+
+def find_regressions(results, baseline, tolerance):
+    """Compare runs with the same key against a baseline; returns (key, metric, old, new) tuples"""
+    previous = {run_key(result): result for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        old = previous.get(run_key(result))
+        if old is None:
+            continue
+        for metric, higher_is_better in REGRESSION_METRICS.items():
+            change = (result[metric] - old[metric]) / old[metric] if old[metric] else 0.0
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append((run_key(result), metric, old[metric], result[metric]))
+        if result["reps"] != old["reps"]:
+            regressions.append((run_key(result), "reps", old["reps"], result["reps"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sources", nargs="*", help="video files or directories of per-exercise recordings")
+    parser.add_argument("--synthetic", type=int, default=0, metavar="N", help="also replay N synthetic frames")
+    parser.add_argument("--exercises", nargs="+", default=EXERCISES, choices=EXERCISES)
+    parser.add_argument("--backends", nargs="+", default=["pytorch"],
+                        help="backend or backend/precision, e.g. pytorch onnx openvino/fp16")
+    parser.add_argument("--resolutions", nargs="+", type=parse_resolution, default=[None],
+                        help="resize frames to WIDTHxHEIGHT (default: source resolution)")
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH)
+    parser.add_argument("--max-frames", type=int, default=None, help="limit frames per run")
+    parser.add_argument("--output", default="benchmark.json")
+    parser.add_argument("--baseline", help="previous results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="relative slowdown that counts as a regression (default 0.1)")
+    args = parser.parse_args()
+    if settings.PIPELINE:
+        parser.error("VTA_PIPELINE=1 is not supported: recv returns before the frame is processed")
+
+    try:
+        sources = collect_sources(args.sources, args.exercises, args.synthetic)
+    except ValueError as exc:
+        parser.error(str(exc))
+    if not sources:
+        parser.error("nothing to replay: give video files, recording directories or --synthetic N")
+
+    results = []
+    for variant in args.backends:
+        backend, _, precision = variant.partition("/")
+        label = f"{backend}/{precision or 'fp32'}"
+        try:
+            model = SharedPoseModel(load_backend(args.model, backend, precision or "fp32"), label)
+            model.warm_up()
+        except Exception as exc:
+            print(f"Skipping {label}: {exc}")
+            continue
+        scheduler = InferenceScheduler(model)
+
+        for resolution in args.resolutions:
+            for app_mode, source, frames in sources:
+                result = run(scheduler, app_mode, frames(), resolution, args.max_frames)
+                if result is None:
+                    print(f"Skipping {source}: no frames")
+                    continue
+                result.update({
+                    "exercise": app_mode,
+                    "source": source,
+                    "resolution": "source" if resolution is None else f"{resolution[0]}x{resolution[1]}",
+                    "backend": label,
+                })
+                results.append(result)
+
+    header = (f"{'Exercise':<18} {'Source':<24} {'Resolution':<10} {'Backend':<16} "
+              f"{'FPS':>7} {'p50':>7} {'p95':>7} {'p99':>7} {'RSS MB':>7} {'+RSS':>6} {'Reps':>5}")
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        print(f"{result['exercise']:<18} {os.path.basename(result['source'])[:24]:<24} "
+              f"{result['resolution']:<10} {result['backend']:<16} {result['fps']:>7.1f} "
+              f"{result['p50_ms']:>7.1f} {result['p95_ms']:>7.1f} {result['p99_ms']:>7.1f} "
+              f"{_mb(result['peak_rss_mb']):>7} {_mb(result['rss_growth_mb']):>6} {result['reps']:>5}")
+
+    report = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "model": args.model,
+            "inference_size": settings.INFERENCE_SIZE,
+            "detect_every": settings.DETECT_EVERY,
+            "rss_after_mb": resident_memory_mb(),
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = find_regressions(results, json.load(f), args.tolerance)
+        for key, metric, old, new in regressions:
+            print(f"REGRESSION {' / '.join(key)}: {metric} {old:.4g} -> {new:.4g}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Exercise analysis shared by the live trainer and the offline tools:
+joint angles, the rep state machine and form feedback.
+
+Exercises are declared in exercises.json. Each entry names the joints it
+measures, the rep thresholds (the gap between up_above and down_below is the
+hysteresis band), which transition counts a rep, ordered form rules, the
+calories burned per rep and optionally its keypoint smoothing parameters.
+Entries are compiled once into an Exercise whose GeometrySpec only computes
+the joints that exercise uses.
+
+A frame whose rep-angle joints are below MIN_KEYPOINT_CONFIDENCE does not move
+the rep state machine and asks the user to stay in view, and a form rule
+whose joints are below it is skipped.
+"""
+import json
+import operator
+
+import settings
+from geometry import KEYPOINT_INDEX, GeometrySpec
+from smoothing import KeypointSmoother
+
+COMPARISONS = {"above": operator.gt, "below": operator.lt}
+NOT_VISIBLE = ("Make sure your whole body is visible", "bad")
+
+
+class Exercise:
+    """A compiled exercise definition evaluated once per frame"""
+
+    def __init__(self, name, spec):
+        self.name = name
+        self.instructions = spec.get("instructions", [])
+        self.kcal_per_rep = float(spec.get("kcal_per_rep", 0))
+
+        geometry = spec["geometry"]
+        self.geometry = GeometrySpec(**{
+            kind: {feature: tuple(self._keypoint(joint) for joint in joints)
+                   for feature, joints in geometry.get(kind, {}).items()}
+            for kind in ("angles", "vertical", "offsets")
+        }, min_confidence=settings.MIN_KEYPOINT_CONFIDENCE)
+        offsets = set(geometry.get("offsets", {}))
+        known = set(geometry.get("angles", {})) | set(geometry.get("vertical", {}))
+
+        rep = spec["rep"]
+        self.rep_angle = rep["angle"]
+        if self.rep_angle not in known:
+            raise ValueError(f"{name}: rep angle {self.rep_angle!r} is not a declared angle")
+        self.up_above = float(rep["up_above"])
+        self.down_below = float(rep["down_below"])
+        self.count_on = rep.get("count_on", "down")
+        if self.count_on not in ("up", "down"):
+            raise ValueError(f"{name}: count_on must be 'up' or 'down'")
+
+        # Keypoint smoothing: false disables it, a dict overrides the defaults from settings
+        smoothing = spec.get("smoothing", True)
+        if smoothing is True:
+            smoothing = {}
+        unknown = set(smoothing or {}) - {"min_cutoff", "beta", "d_cutoff"}
+        if unknown:
+            raise ValueError(f"{name}: unknown smoothing parameters {sorted(unknown)}")
+        self.smoothing = None
+        if smoothing is not False and settings.SMOOTHING:
+            self.smoothing = {key: float(value) for key, value in smoothing.items()}
+
+        # Form rules as (feature, component, compare, threshold, direction, feedback, type)
+        self.form_rules = []
+        for rule in spec.get("form", []):
+            feature, _, axis = rule["feature"].partition(".")
+            if feature in offsets and axis in ("x", "y"):
+                component = "xy".index(axis)
+            elif feature in known and not axis:
+                component = None
+            else:
+                raise ValueError(f"{name}: unknown form feature {rule['feature']!r}")
+            comparisons = [key for key in COMPARISONS if key in rule]
+            if len(comparisons) != 1:
+                raise ValueError(f"{name}: form rule needs exactly one of 'above' or 'below'")
+            comparison = comparisons[0]
+            self.form_rules.append((feature, component, COMPARISONS[comparison], float(rule[comparison]),
+                                    rule.get("direction"), rule["feedback"], rule.get("type", "good")))
+
+    def _keypoint(self, joint):
+        if joint not in KEYPOINT_INDEX:
+            raise ValueError(f"{self.name}: unknown keypoint {joint!r}")
+        return KEYPOINT_INDEX[joint]
+
+    def features(self, keypoints):
+        """Compute the joints this exercise uses for a (17, 3) or (N, 17, 3) keypoint array"""
+        return self.geometry(keypoints)
+
+    def visible(self, features):
+        """Whether the keypoints of the rep angle were confidently detected"""
+        return bool(features[f"{self.rep_angle}_ok"])
+
+    def count_rep(self, features, counter, direction):
+        """Advance the rep state machine; returns the angle, counter and direction"""
+        angle = features[self.rep_angle]
+        if not self.visible(features):
+            return angle, counter, direction
+        if direction == "down" and angle > self.up_above:
+            direction = "up"
+            if self.count_on == "up":
+                counter += 1
+        elif direction == "up" and angle < self.down_below:
+            direction = "down"
+            if self.count_on == "down":
+                counter += 1
+        return angle, counter, direction
+
+    def check_form(self, features, direction):
+        """Return the feedback of the first matching form rule"""
+        if not self.visible(features):
+            return NOT_VISIBLE
+        for feature, component, compare, threshold, rule_direction, feedback, feedback_type in self.form_rules:
+            if not features[f"{feature}_ok"]:
+                continue
+            value = features[feature] if component is None else features[feature][component]
+            if compare(value, threshold) and rule_direction in (None, direction):
+                return feedback, feedback_type
+        return "", "good"
+
+    def smoother(self):
+        """A new per-session keypoint filter, or None if smoothing is disabled"""
+        return KeypointSmoother(**self.smoothing) if self.smoothing is not None else None
+
+    def calories(self, reps):
+        return self.kcal_per_rep * reps
+
+
+def load_exercises(path=settings.EXERCISES_FILE):
+    """Load and compile the exercise definitions, keeping the file's order"""
+    with open(path) as f:
+        definitions = json.load(f)
+    return {name: Exercise(name, spec) for name, spec in definitions.items()}
+
+
+EXERCISE_REGISTRY = load_exercises()
+EXERCISES = list(EXERCISE_REGISTRY)
+
+
+def count_rep(keypoints, app_mode, counter, direction, features=None):
+    """Run one frame through the rep state machine
+
+    Returns the tracked joint angle and the updated counter and direction.
+    """
+    exercise = EXERCISE_REGISTRY.get(app_mode)
+    if exercise is None:
+        return 0, counter, direction
+    if features is None:
+        features = exercise.features(keypoints)
+    return exercise.count_rep(features, counter, direction)
+
+
+def check_form(keypoints, exercise_type, angle, direction, features=None):
+    """Check if the form is correct for the exercise"""
+    if len(keypoints) < 17:  # Not all keypoints detected
+        return NOT_VISIBLE
+
+    exercise = EXERCISE_REGISTRY.get(exercise_type)
+    if exercise is None:
+        return "", "good"
+    if features is None:
+        features = exercise.features(keypoints)
+    return exercise.check_form(features, direction)
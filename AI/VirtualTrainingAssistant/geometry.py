@@ -0,0 +1,91 @@
+"""
+Vectorized keypoint geometry.
+
+Every function takes the YOLO pose keypoints as a (17, 3) array of
+(x, y, confidence) for one frame, or an (N, 17, 3) batch for offline
+analysis, and evaluates all requested joints at once.
+"""
+import numpy as np
+
+# COCO keypoint order of the YOLO pose model
+KEYPOINT_NAMES = [
+    "nose", "left_eye", "right_eye", "left_ear", "right_ear",
+    "left_shoulder", "right_shoulder", "left_elbow", "right_elbow", "left_wrist", "right_wrist",
+    "left_hip", "right_hip", "left_knee", "right_knee", "left_ankle", "right_ankle",
+]
+KEYPOINT_INDEX = {name: index for index, name in enumerate(KEYPOINT_NAMES)}
+
+DEFAULT_MIN_CONFIDENCE = 0.5
+
+
+def _as_keypoints(keypoints):
+    return np.asarray(keypoints, dtype=np.float64)
+
+
+def joint_angles(keypoints, triplets):
+    """Angles in degrees (0-180) at the middle point of each (a, vertex, c) triplet"""
+    kp = _as_keypoints(keypoints)
+    index = np.asarray(triplets, dtype=np.intp).reshape(-1, 3)
+    a, b, c = kp[..., index[:, 0], :2], kp[..., index[:, 1], :2], kp[..., index[:, 2], :2]
+    radians = (np.arctan2(c[..., 1] - b[..., 1], c[..., 0] - b[..., 0])
+               - np.arctan2(a[..., 1] - b[..., 1], a[..., 0] - b[..., 0]))
+    angles = np.abs(np.degrees(radians))
+    return np.where(angles > 180.0, 360.0 - angles, angles)
+
+
+def vertical_angles(keypoints, pairs):
+    """Angles in degrees between straight down and the segment of each (origin, point) pair"""
+    kp = _as_keypoints(keypoints)
+    index = np.asarray(pairs, dtype=np.intp).reshape(-1, 2)
+    delta = kp[..., index[:, 1], :2] - kp[..., index[:, 0], :2]
+    # Image y grows downwards, so "down" is +y
+    return np.abs(np.degrees(np.arctan2(delta[..., 0], delta[..., 1])))
+
+
+def joint_offsets(keypoints, pairs):
+    """(dx, dy) from the first to the second keypoint of each pair"""
+    kp = _as_keypoints(keypoints)
+    index = np.asarray(pairs, dtype=np.intp).reshape(-1, 2)
+    return kp[..., index[:, 1], :2] - kp[..., index[:, 0], :2]
+
+
+def confidence_mask(keypoints, groups, min_confidence=DEFAULT_MIN_CONFIDENCE):
+    """True where every keypoint of a group is at least min_confidence"""
+    kp = _as_keypoints(keypoints)
+    index = np.asarray(groups, dtype=np.intp)
+    return (kp[..., index, 2] >= min_confidence).all(axis=-1)
+
+
+class GeometrySpec:
+    """A fixed set of named angles and offsets evaluated in one pass per call
+
+    Calling the spec with keypoints returns a dict mapping each name to its
+    value (a float for one frame, an (N,) or (N, 2) array for a batch) and
+    `<name>_ok` to whether all of its keypoints were confidently detected.
+    """
+
+    def __init__(self, angles=None, vertical=None, offsets=None,
+                 min_confidence=DEFAULT_MIN_CONFIDENCE):
+        self.angles = dict(angles or {})
+        self.vertical = dict(vertical or {})
+        self.offsets = dict(offsets or {})
+        self.min_confidence = min_confidence
+        # Index arrays are built once so a call does no per-joint Python work
+        self._passes = [
+            (list(named), np.asarray(list(named.values()), dtype=np.intp), compute)
+            for named, compute in ((self.angles, joint_angles), (self.vertical, vertical_angles),
+                                   (self.offsets, joint_offsets))
+            if named
+        ]
+
+    def __call__(self, keypoints):
+        kp = _as_keypoints(keypoints)
+        axis = kp.ndim - 2  # position of the group axis: 0 for one frame, 1 for a batch
+        features = {}
+        for names, index, compute in self._passes:
+            values = compute(kp, index)
+            confident = confidence_mask(kp, index, self.min_confidence)
+            for i, name in enumerate(names):
+                features[name] = np.take(values, i, axis=axis)
+                features[f"{name}_ok"] = np.take(confident, i, axis=axis)
+        return features
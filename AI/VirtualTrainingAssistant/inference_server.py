@@ -0,0 +1,139 @@
+"""
+Central pose inference scheduler shared by all WebRTC sessions.
+
+Frames submitted by every session are queued and run through the shared
+model in dynamic micro-batches (up to MAX_BATCH_SIZE frames, waiting at most
+MAX_BATCH_WAIT_MS for a batch to fill).
+
+Backpressure comes from the blocking call: a session's recv waits in infer
+until its frame's keypoints are back, so each session has at most one frame
+queued and never builds up latency here. Frames that arrive from the camera
+meanwhile are queued or dropped by streamlit-webrtc (or by the pipeline's
+drop-oldest queues), not by the scheduler.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import metrics
+import settings
+from model_registry import DEFAULT_MODEL_PATH, get_pose_model
+
+logger = logging.getLogger(__name__)
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+# What infer returns for a frame that was dropped instead of run, as opposed to
+# None for a frame in which no person was found (WorkerPool drops frames when
+# every worker slot is busy; InferenceScheduler runs every frame)
+DROPPED = object()
+
+
+def first_person_keypoints(result):
+    """Return the (17, 3) keypoint array of the first detected person, or None"""
+    keypoints = result.keypoints
+    if keypoints is None or len(keypoints.data) == 0:
+        return None
+    return keypoints.data[0].cpu().numpy()
+
+
+class _Request:
+    def __init__(self, image):
+        self.image = image
+        self.submitted = time.monotonic()
+        self.future = Future()
+
+
+class InferenceScheduler:
+    """Groups frames from many sessions into batched model calls"""
+
+    def __init__(self, model, max_batch_size=settings.MAX_BATCH_SIZE,
+                 max_wait=settings.MAX_BATCH_WAIT_MS / 1000,
+                 imgsz=settings.INFERENCE_SIZE):
+        self.model = model
+        self.imgsz = imgsz
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.batches_run = 0
+        self.frames_run = 0
+        self._pending = deque()  # _Requests, oldest first
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="pose-inference", daemon=True)
+        self._thread.start()
+
+    def submit(self, session_id, image):
+        """Queue a frame for a session and return a Future for its keypoints"""
+        request = _Request(image)
+        with self._cond:
+            self._pending.append(request)
+            self._cond.notify()
+        return request.future
+
+    def infer(self, session_id, image, timeout=None):
+        """Block until the frame's keypoints are ready"""
+        return self.submit(session_id, image).result(timeout)
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+
+            # Give other sessions a short window to join the batch
+            deadline = self._pending[0].submitted + self.max_wait
+            while len(self._pending) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch = []
+            while self._pending and len(batch) < self.max_batch_size:
+                request = self._pending.popleft()
+                request.future.set_running_or_notify_cancel()
+                batch.append(request)
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            start = time.perf_counter()
+            try:
+                results = self.model([request.image for request in batch], imgsz=self.imgsz)
+            except Exception as exc:
+                logger.exception("Batched pose inference failed")
+                for request in batch:
+                    request.future.set_exception(exc)
+                continue
+
+            metrics.INFERENCE_BATCH_SECONDS.observe(time.perf_counter() - start)
+            metrics.INFERENCE_BATCH_SIZE.observe(len(batch))
+            self.batches_run += 1
+            self.frames_run += len(batch)
+            for request, result in zip(batch, results):
+                request.future.set_result(first_person_keypoints(result))
+
+
+def get_scheduler(model_path=DEFAULT_MODEL_PATH):
+    """Return the process-wide scheduler for a model, starting it on first use
+
+    With INFERENCE_WORKERS set this is a WorkerPool of model processes instead.
+    """
+    scheduler = _schedulers.get(model_path)
+    if scheduler is not None:
+        return scheduler
+
+    with _schedulers_lock:
+        scheduler = _schedulers.get(model_path)
+        if scheduler is None:
+            if settings.INFERENCE_WORKERS > 0:
+                from worker_pool import WorkerPool
+                scheduler = WorkerPool(settings.INFERENCE_WORKERS, model_path)
+                atexit.register(scheduler.close)
+            else:
+                scheduler = InferenceScheduler(get_pose_model(model_path))
+            _schedulers[model_path] = scheduler
+        return scheduler
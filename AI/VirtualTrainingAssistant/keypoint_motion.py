@@ -0,0 +1,81 @@
+"""
+Frame skipping for pose inference with keypoint extrapolation in between.
+
+Full inference runs only every N frames (DETECT_EVERY), or on an adaptive
+schedule when LATENCY_BUDGET_MS is set: the interval becomes the number of
+frames needed to amortize the measured inference latency over the per-frame
+budget. On skipped frames the keypoints are extrapolated with a constant
+velocity model from the last two detections, so the overlay and the rep state
+machine keep receiving a keypoint estimate every frame.
+"""
+import math
+
+import settings
+
+# How far (in seconds) a detection may be extrapolated before it is considered stale
+MAX_EXTRAPOLATION_SECONDS = 0.5
+
+# Smoothing factor for the running inference latency estimate
+LATENCY_EWMA_ALPHA = 0.2
+
+
+class KeypointInterpolator:
+    """Per-session detection schedule and constant-velocity keypoint predictor"""
+
+    def __init__(self, detect_every=settings.DETECT_EVERY,
+                 latency_budget_ms=settings.LATENCY_BUDGET_MS,
+                 max_interval=settings.MAX_DETECT_INTERVAL):
+        self.interval = max(1, detect_every)
+        self.latency_budget = latency_budget_ms / 1000 if latency_budget_ms else None
+        self.max_interval = max(1, max_interval)
+        self.mean_latency = None
+        self.frames_since_detection = 0
+        self._keypoints = None
+        self._timestamp = None
+        self._velocity = None
+
+    def should_detect(self):
+        """Whether the next frame needs full pose inference"""
+        if self._keypoints is None:
+            return True
+        return self.frames_since_detection + 1 >= self.interval
+
+    def update(self, keypoints, timestamp, latency=None):
+        """Record a detection result (None if no person was found)"""
+        self.frames_since_detection = 0
+        if latency is not None:
+            self._update_interval(latency)
+
+        if keypoints is None:
+            # Lost the person: never extrapolate across a gap
+            self._keypoints = self._timestamp = self._velocity = None
+            return
+
+        if self._keypoints is not None and timestamp > self._timestamp:
+            self._velocity = (keypoints[:, :2] - self._keypoints[:, :2]) / (timestamp - self._timestamp)
+        else:
+            self._velocity = None
+        self._keypoints = keypoints
+        self._timestamp = timestamp
+
+    def predict(self, timestamp):
+        """Estimate the keypoints for a skipped frame (None if there is no track)"""
+        self.frames_since_detection += 1
+        if self._keypoints is None:
+            return None
+
+        predicted = self._keypoints.copy()
+        if self._velocity is not None:
+            elapsed = min(timestamp - self._timestamp, MAX_EXTRAPOLATION_SECONDS)
+            predicted[:, :2] += self._velocity * elapsed
+        return predicted
+
+    def _update_interval(self, latency):
+        if self.mean_latency is None:
+            self.mean_latency = latency
+        else:
+            self.mean_latency += LATENCY_EWMA_ALPHA * (latency - self.mean_latency)
+
+        if self.latency_budget:
+            needed = math.ceil(self.mean_latency / self.latency_budget)
+            self.interval = min(max(1, needed), self.max_interval)
@@ -0,0 +1,287 @@
+"""
+Process-wide metrics for the live trainer in the Prometheus text format.
+
+Per-frame stage latencies are recorded in fixed-bucket histograms, which
+costs one bisect and two additions per observation. start_metrics_server
+serves every metric at http://VTA_METRICS_HOST:VTA_METRICS_PORT/metrics (loopback
+by default) from a daemon thread, next to the Streamlit server and its
+/_stcore/health check.
+"""
+import bisect
+import logging
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import settings
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds, from sub-millisecond drawing to slow CPU inference
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_metrics = []
+_server = None
+_server_started = False
+_server_lock = threading.Lock()
+
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    return "+Inf" if value == math.inf else repr(float(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._children = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def labels(self, *values):
+        """Return the child for a set of label values, creating it on first use"""
+        values = tuple(str(value) for value in values)
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _default(self):
+        return self.labels() if not self.label_names else None
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in list(self._children.items()):
+            lines.extend(child.render(self.name, self.label_names, values))
+        return lines
+
+
+class _Value:
+    def __init__(self, function=None):
+        self.value = 0.0
+        self.function = function
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def set(self, value):
+        self.value = value
+
+    def get(self):
+        return self.function() if self.function is not None else self.value
+
+    def render(self, name, label_names, values):
+        value = self.get()
+        if value is None:
+            return []
+        return [f"{name}{_format_labels(label_names, values)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1):
+        self._default().inc(amount)
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, or is read from a function at scrape time"""
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labels=(), function=None):
+        super().__init__(name, documentation, labels)
+        if function is not None:
+            self._children[()] = _Value(function)
+
+    def _new_child(self):
+        return _Value()
+
+    def set(self, value):
+        self._default().set(value)
+
+    def inc(self, amount=1):
+        self._default().inc(amount)
+
+    def dec(self, amount=1):
+        self._default().inc(-amount)
+
+
+class _HistogramValue:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last slot is the +Inf bucket
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q):
+        """Estimate a quantile by linear interpolation within its bucket (None if empty)"""
+        with self._lock:
+            counts, total = list(self.counts), self.count
+        if not total:
+            return None
+        rank = q * total
+        cumulative = 0
+        for index, count in enumerate(counts):
+            if cumulative + count >= rank and count:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                if index == len(self.buckets):
+                    return lower  # beyond the last bound nothing better is known
+                return lower + (self.buckets[index] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def render(self, name, label_names, values):
+        with self._lock:
+            counts, total, value_sum = list(self.counts), self.count, self.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            cumulative += count
+            labels = _format_labels(label_names, values, f'le="{_format_value(bound)}"')
+            lines.append(f"{name}_bucket{labels} {cumulative}")
+        labels = _format_labels(label_names, values)
+        lines.append(f"{name}_sum{labels} {_format_value(value_sum)}")
+        lines.append(f"{name}_count{labels} {total}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Distribution of observations over fixed buckets"""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labels)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self._default().observe(value)
+
+
+def timed(histogram, func):
+    """Wrap func so every call's duration is observed in a histogram (or histogram child)"""
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            histogram.observe(time.perf_counter() - start)
+    return wrapper
+
+
+def render_metrics():
+    """Return all metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def _resident_memory_bytes():
+    from model_registry import resident_memory_mb
+    rss = resident_memory_mb()
+    return rss * 1024 * 1024 if rss is not None else None
+
+
+STAGE_SECONDS = Histogram(
+    "vta_stage_seconds", "Time spent in each step of VideoProcessor.recv", ["stage"])
+FRAME_SECONDS = Histogram(
+    "vta_frame_seconds", "Wall time of one VideoProcessor.recv call")
+FRAMES = Counter("vta_frames_total", "Camera frames received")
+DROPPED_FRAMES = Counter(
+    "vta_dropped_frames_total", "Frames dropped before being annotated", ["reason"])
+ACTIVE_SESSIONS = Gauge("vta_active_sessions", "WebRTC sessions currently streaming")
+INFERENCE_BATCH_SECONDS = Histogram(
+    "vta_inference_batch_seconds", "Time of one batched pose model call")
+INFERENCE_BATCH_SIZE = Histogram(
+    "vta_inference_batch_size", "Frames per batched pose model call",
+    buckets=(1, 2, 3, 4, 6, 8, 12, 16, 32))
+MODEL_LOAD_SECONDS = Gauge(
+    "vta_model_load_seconds", "Time to load the pose model", ["model", "backend"])
+MODEL_WARMUP_SECONDS = Gauge(
+    "vta_model_warmup_seconds", "Time of the pose model warm-up call", ["model", "backend"])
+RESIDENT_MEMORY = Gauge(
+    "vta_resident_memory_bytes", "Resident set size of the process", function=_resident_memory_bytes)
+
+
+def stage_summary():
+    """p50/p95 latency in ms and frame count for each recv stage, for the debug panel"""
+    summary = {}
+    for (stage,), child in list(STAGE_SECONDS._children.items()):
+        if child.count:
+            summary[stage] = {
+                "p50_ms": child.quantile(0.5) * 1000,
+                "p95_ms": child.quantile(0.95) * 1000,
+                "frames": child.count,
+            }
+    return summary
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_metrics().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # scrapes every few seconds would flood the log
+
+
+def start_metrics_server(port=settings.METRICS_PORT, host=settings.METRICS_HOST):
+    """Serve /metrics on a daemon thread once per process; port 0 disables it"""
+    global _server, _server_started
+    if not port or _server_started:
+        return _server
+
+    with _server_lock:
+        if not _server_started:
+            _server_started = True
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError:
+                # Another process (e.g. a second Streamlit worker) already serves it
+                logger.warning("Metrics endpoint not started: port %s is in use", port)
+                return None
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+            logger.info("Serving metrics on http://%s:%s/metrics", host, port)
+        return _server
@@ -0,0 +1,102 @@
+"""
+Process-wide registry for the YOLO pose model.
+
+Every WebRTC session shares one loaded copy of the weights instead of
+deserializing its own in VideoProcessor.__init__.
+"""
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+import metrics
+import settings
+from pose_backends import load_pose_model
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_PATH = "yolov8n-pose.pt"
+
+_models = {}
+_stats = {}
+_registry_lock = threading.Lock()
+
+
+def resident_memory_mb():
+    """Return the resident set size of this process in MB (None if unknown)"""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class SharedPoseModel:
+    """Thread-safe wrapper around a single YOLO pose model instance"""
+
+    def __init__(self, model, backend="pytorch"):
+        self.model = model
+        self.backend = backend
+        self._lock = threading.Lock()
+
+    def __call__(self, source, **kwargs):
+        kwargs.setdefault("verbose", False)
+        # The ultralytics predictor keeps per-call state, so calls are serialized
+        with self._lock:
+            return self.model(source, **kwargs)
+
+    def warm_up(self, width=640, height=480):
+        """Run one dummy frame so the first real frame does not pay for setup"""
+        self(np.zeros((height, width, 3), dtype=np.uint8), imgsz=settings.INFERENCE_SIZE)
+
+
+def get_pose_model(model_path=DEFAULT_MODEL_PATH, backend=settings.POSE_BACKEND,
+                   precision=settings.POSE_PRECISION):
+    """Return the shared pose model, loading and warming it up on first use
+
+    backend and precision only apply to the first call for a model_path.
+    """
+    model = _models.get(model_path)
+    if model is not None:
+        return model
+
+    with _registry_lock:
+        model = _models.get(model_path)
+        if model is not None:
+            return model
+
+        rss_before = resident_memory_mb()
+        start = time.perf_counter()
+        model = SharedPoseModel(*load_pose_model(model_path, backend, precision))
+        loaded = time.perf_counter()
+        model.warm_up()
+        warmed = time.perf_counter()
+        rss_after = resident_memory_mb()
+
+        _stats[model_path] = {
+            "backend": model.backend,
+            "load_seconds": loaded - start,
+            "warmup_seconds": warmed - loaded,
+            "rss_before_mb": rss_before,
+            "rss_after_mb": rss_after,
+        }
+        _models[model_path] = model
+        metrics.MODEL_LOAD_SECONDS.labels(model_path, model.backend).set(loaded - start)
+        metrics.MODEL_WARMUP_SECONDS.labels(model_path, model.backend).set(warmed - loaded)
+        logger.info(
+            "Loaded pose model %s on %s in %.2fs (warm-up %.2fs), RSS %s MB",
+            model_path, model.backend, loaded - start, warmed - loaded,
+            f"{rss_after:.1f}" if rss_after is not None else "unknown",
+        )
+        return model
+
+
+def model_stats(model_path=DEFAULT_MODEL_PATH):
+    """Return load time and memory figures for a loaded model (empty if not loaded)"""
+    stats = dict(_stats.get(model_path, {}))
+    if stats:
+        stats["rss_current_mb"] = resident_memory_mb()
+    return stats
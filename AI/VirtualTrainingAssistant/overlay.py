@@ -0,0 +1,110 @@
+"""
+Skeleton and HUD overlay for the trainer video.
+
+The skeleton is drawn with a single cv2.polylines call: every bone is a
+two-point polyline and every keypoint a zero-length one, whose thick round
+caps render as dots. HUD text is rendered once per distinct string into a
+cached mask sprite and stamped onto the frame with one masked assignment.
+
+AsyncOverlay moves the drawing to its own thread so that annotating frame N
+overlaps with inference on frame N+1, at the cost of one frame of delay.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import cv2
+import numpy as np
+
+SKELETON = np.array([
+    (5, 7), (7, 9),  # Left arm
+    (6, 8), (8, 10),  # Right arm
+    (5, 6),  # Shoulders
+    (5, 11), (6, 12),  # Torso
+    (11, 13), (13, 15),  # Left leg
+    (12, 14), (14, 16),  # Right leg
+])
+BONE_COLOR = (0, 255, 255)
+BONE_THICKNESS = 2
+KEYPOINT_COLOR = (0, 255, 0)
+KEYPOINT_RADIUS = 5
+
+HUD_FONT = cv2.FONT_HERSHEY_SIMPLEX
+HUD_WHITE = (255, 255, 255)
+HUD_GOOD = (0, 255, 0)
+HUD_BAD = (0, 0, 255)
+
+
+@lru_cache(maxsize=512)
+def text_sprite(text, scale, color, thickness=2):
+    """Render text once; returns the colored sprite, its mask and the baseline origin in it"""
+    (width, height), baseline = cv2.getTextSize(text, HUD_FONT, scale, thickness)
+    # Pad by the stroke thickness, which cv2.getTextSize does not fully account for
+    origin = (thickness, thickness + height)
+    mask = np.zeros((height + baseline + 2 * thickness, width + 2 * thickness), dtype=np.uint8)
+    cv2.putText(mask, text, origin, HUD_FONT, scale, 255, thickness)
+    # Keep the solid core of the anti-aliased glyphs so stamping is a plain masked copy
+    mask = (mask >= 128).astype(np.uint8)
+    sprite = np.zeros(mask.shape + (3,), dtype=np.uint8)
+    sprite[mask > 0] = color
+    return sprite, mask, origin
+
+
+def stamp_text(img, text, org, scale, color, thickness=2):
+    """Draw cached text with its baseline starting at org, like cv2.putText"""
+    if not text:
+        return
+    sprite, mask, origin = text_sprite(text, scale, color, thickness)
+    x, y = org[0] - origin[0], org[1] - origin[1]
+    # Clip the sprite to the frame
+    top, left = max(0, -y), max(0, -x)
+    bottom = min(mask.shape[0], img.shape[0] - y)
+    right = min(mask.shape[1], img.shape[1] - x)
+    if bottom <= top or right <= left:
+        return
+    cv2.copyTo(sprite[top:bottom, left:right], mask[top:bottom, left:right],
+               img[y + top:y + bottom, x + left:x + right])
+
+
+def draw_skeleton(img, keypoints):
+    """Draw all bones and keypoints of a (17, 3) keypoint array in place"""
+    points = keypoints[:, :2].astype(np.int32)
+    cv2.polylines(img, points[SKELETON], False, BONE_COLOR, BONE_THICKNESS)
+    # Zero-length segments with round caps draw filled dots in one call
+    cv2.polylines(img, points[:, None, :].repeat(2, axis=1), False, KEYPOINT_COLOR, KEYPOINT_RADIUS * 2)
+
+
+def draw_hud(img, angle, reps, feedback, feedback_type):
+    """Draw the angle, rep counter and form feedback in place"""
+    stamp_text(img, f"Angle: {int(angle)}", (10, 30), 1, HUD_WHITE)
+    stamp_text(img, f"Reps: {int(reps)}", (10, 70), 1, HUD_WHITE)
+    stamp_text(img, feedback, (10, 110), 0.8, HUD_GOOD if feedback_type == "good" else HUD_BAD)
+
+
+def render(img, keypoints, hud):
+    """Annotate a frame with the skeleton and a (angle, reps, feedback, feedback_type) HUD"""
+    if keypoints is not None:
+        draw_skeleton(img, keypoints)
+    if hud is not None:
+        draw_hud(img, *hud)
+    return img
+
+
+class AsyncOverlay:
+    """Annotates frames on a background thread, one frame behind the caller"""
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="overlay")
+        self._pending = None
+
+    def submit(self, img, keypoints, hud):
+        """Queue a frame for annotation and return the previous annotated frame
+
+        The first call returns the frame itself un-annotated.
+        """
+        previous = self._pending
+        first = img.copy() if previous is None else None
+        self._pending = self._executor.submit(render, img, keypoints, hud)
+        return previous.result() if previous is not None else first
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
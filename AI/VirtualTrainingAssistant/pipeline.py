@@ -0,0 +1,155 @@
+"""
+Staged frame pipeline with bounded, drop-oldest queues.
+
+Each stage runs on its own thread and hands its result to the next stage
+through a small queue. When a queue is full the oldest frame in it is
+discarded, so a slow stage sheds load instead of building up latency, and
+consecutive frames overlap across stages. A frame whose step raises is
+logged and dropped; the stage carries on with the next one.
+"""
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+_CLOSED = object()
+
+# Smoothing factor for the per-stage latency average
+LATENCY_EWMA_ALPHA = 0.1
+
+
+class DropOldestQueue:
+    """Bounded FIFO whose put never blocks: the oldest item is dropped instead"""
+
+    def __init__(self, maxsize, on_drop=None):
+        self._items = deque()
+        self._on_drop = on_drop
+        self._maxsize = maxsize
+        self._cond = threading.Condition()
+        self._closed = False
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) >= self._maxsize:
+                self._items.popleft()
+                self._drop()
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Return the oldest item, None on timeout, or _CLOSED once closed"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items or self._closed, timeout):
+                return None
+            return self._items.popleft() if self._items else _CLOSED
+
+    def get_newest(self, timeout=None):
+        """Like get, but return the newest item and drop the older ones"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items or self._closed, timeout):
+                return None
+            if not self._items:
+                return _CLOSED
+            while len(self._items) > 1:
+                self._items.popleft()
+                self._drop()
+            return self._items.popleft()
+
+    def _drop(self):
+        self.dropped += 1
+        if self._on_drop is not None:
+            self._on_drop()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class Stage:
+    """One pipeline step running func on its own thread"""
+
+    def __init__(self, name, func, inbox, outbox, on_error=None):
+        self.name = name
+        self.func = func
+        self.inbox = inbox
+        self.outbox = outbox
+        self.on_error = on_error
+        self.processed = 0
+        self.errors = 0
+        self.last_ms = 0.0
+        self.mean_ms = 0.0
+        self._thread = threading.Thread(target=self._run, name=f"pipeline-{name}", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self.inbox.get()
+            if item is _CLOSED:
+                self.outbox.close()
+                return
+            start = time.perf_counter()
+            try:
+                result = self.func(item)
+            except Exception:
+                logger.exception("Pipeline stage %s failed, dropping the frame", self.name)
+                self.errors += 1
+                if self.on_error is not None:
+                    self.on_error()
+                continue
+            self._record((time.perf_counter() - start) * 1000)
+            if result is not None:
+                self.outbox.put(result)
+
+    def _record(self, elapsed_ms):
+        self.last_ms = elapsed_ms
+        self.mean_ms = elapsed_ms if not self.processed else (
+            self.mean_ms + LATENCY_EWMA_ALPHA * (elapsed_ms - self.mean_ms))
+        self.processed += 1
+
+
+class FramePipeline:
+    """Chain of (name, func) stages; a stage returning None or raising drops the frame
+
+    on_drop is called whenever a queue discards a frame, on_error whenever a
+    stage raises.
+    """
+
+    def __init__(self, stages, queue_size=2, on_drop=None, on_error=None):
+        self.queues = [DropOldestQueue(queue_size, on_drop) for _ in range(len(stages) + 1)]
+        self.stages = [Stage(name, func, self.queues[i], self.queues[i + 1], on_error)
+                       for i, (name, func) in enumerate(stages)]
+
+    def put(self, item):
+        self.queues[0].put(item)
+
+    def get(self, timeout=None):
+        """Return the newest finished item, or None if none is ready within timeout
+
+        Older finished items are dropped; they would only add latency.
+        """
+        item = self.queues[-1].get_newest(timeout)
+        return None if item is _CLOSED else item
+
+    def stats(self):
+        """Queue depth, dropped frames and latency for each stage"""
+        return {
+            stage.name: {
+                "queue_depth": len(stage.inbox),
+                "dropped": stage.inbox.dropped,
+                "processed": stage.processed,
+                "errors": stage.errors,
+                "last_ms": stage.last_ms,
+                "mean_ms": stage.mean_ms,
+            }
+            for stage in self.stages
+        }
+
+    def close(self):
+        self.queues[0].close()
@@ -0,0 +1,240 @@
+"""
+Pluggable inference backends for the pose model.
+
+The PyTorch checkpoint is exported once to ONNX, OpenVINO IR or TorchScript,
+cached under EXPORT_DIR and loaded back through ultralytics, which runs it
+with the matching engine (onnxruntime, OpenVINO, torch.jit). POSE_BACKEND
+selects the engine; "auto" picks the fastest one installed for CPU inference
+that supports POSE_PRECISION (see quantization.py for the reduced-precision
+variants). Any failure to export or load falls back to the PyTorch checkpoint.
+
+Exports are safe to run from several processes at once. Only one process
+exports a given artifact, holding a lock file next to it; the others wait and
+then load its result. The export is written into a private staging directory
+and renamed into place, so a half-written artifact is never picked up.
+
+Before ultralytics loads an export, its runtime deserializes it while the
+process holds a shared lock on it. An artifact the runtime cannot read is
+deleted under the exclusive lock, so the next start exports it again instead of
+failing the same way. Other errors, like a missing runtime, keep the artifact.
+"""
+import contextlib
+import hashlib
+import importlib.util
+import logging
+import os
+import shutil
+import tempfile
+
+import settings
+from quantization import (PRECISIONS, load_calibration_frames, quantize_onnx_dynamic,
+                          quantize_onnx_static, quantize_openvino_static)
+
+try:
+    import fcntl
+except ImportError:  # Windows: the staging rename alone keeps artifacts whole
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Backend name -> (ultralytics export format, runtime module, exported suffix)
+BACKENDS = {
+    "onnx": ("onnx", "onnxruntime", ".onnx"),
+    "openvino": ("openvino", "openvino", "_openvino_model"),
+    "torchscript": ("torchscript", "torch", ".torchscript"),
+}
+
+# Preference order for "auto", fastest CPU engine first
+AUTO_ORDER = ["openvino", "onnx"]
+
+
+def register_safe_globals():
+    """Allow torch.load to unpickle the ultralytics pose checkpoint"""
+    import torch
+    from torch.nn import Sequential
+    from ultralytics.nn.tasks import PoseModel
+
+    torch.serialization.add_safe_globals([PoseModel, Sequential, torch.nn.modules.conv.Conv1d, torch.nn.modules.conv.Conv2d, torch.nn.modules.conv.Conv3d])
+
+
+def available_backends():
+    """Return the exported backends whose runtime is installed"""
+    return [name for name, (_, module, _) in BACKENDS.items()
+            if importlib.util.find_spec(module) is not None]
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def export_path(model_path, backend, imgsz=settings.INFERENCE_SIZE,
+                export_dir=settings.EXPORT_DIR, precision="fp32"):
+    """Return where the exported artifact for a checkpoint is cached"""
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    suffix = BACKENDS[backend][2]
+    name = f"{stem}-{_file_digest(model_path)}-{imgsz}-{precision}{suffix}"
+    return os.path.join(export_dir, name)
+
+
+class CorruptExport(RuntimeError):
+    """A cached export that its runtime cannot deserialize"""
+
+    def __init__(self, path, reason):
+        super().__init__(f"cannot read {path}: {reason}")
+        self.path = path
+
+
+@contextlib.contextmanager
+def _export_lock(target, shared=False):
+    """Hold a lock on target's lock file: exclusive to export or delete it, shared to read it"""
+    with open(f"{target}.lock", "w") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        yield
+
+
+def read_export(path, backend):
+    """Deserialize an exported artifact with its runtime, raising CorruptExport if it is unreadable"""
+    runtime = importlib.import_module(BACKENDS[backend][1])
+    try:
+        if backend == "onnx":
+            runtime.InferenceSession(path, providers=["CPUExecutionProvider"])
+        elif backend == "openvino":
+            xml = [name for name in os.listdir(path) if name.endswith(".xml")]
+            if not xml:
+                raise CorruptExport(path, "no .xml model")
+            runtime.Core().read_model(os.path.join(path, xml[0]))
+        else:
+            runtime.jit.load(path, map_location="cpu")
+    except (CorruptExport, OSError, MemoryError):
+        raise  # I/O and memory errors say nothing about the artifact itself
+    except Exception as exc:
+        raise CorruptExport(path, exc) from exc
+
+
+def discard_export(path, backend):
+    """Delete a cached artifact (a file or an OpenVINO directory) that cannot be read
+
+    It is read once more under the exclusive lock, which waits for processes
+    still reading it and keeps one that another process has replaced.
+    """
+    with _export_lock(path):
+        try:
+            read_export(path, backend)
+            return
+        except CorruptExport:
+            pass
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif os.path.exists(path):
+            os.remove(path)
+
+
+def export_model(model_path, backend, imgsz=settings.INFERENCE_SIZE,
+                 export_dir=settings.EXPORT_DIR, precision="fp32"):
+    """Export a checkpoint for a backend unless a cached artifact already exists"""
+    if backend not in PRECISIONS.get(precision, ()):
+        raise ValueError(f"{backend} does not support {precision} precision")
+
+    target = export_path(model_path, backend, imgsz, export_dir, precision)
+    if os.path.exists(target):
+        return target
+    # Quantized variants start from the cached FP32 export
+    source = export_model(model_path, backend, imgsz, export_dir) if precision.startswith("int8") else None
+
+    os.makedirs(export_dir, exist_ok=True)
+    with _export_lock(target):
+        if os.path.exists(target):
+            return target  # another process exported it while we waited
+
+        staging = tempfile.mkdtemp(dir=export_dir, prefix=".export-")
+        try:
+            staged = os.path.join(staging, os.path.basename(target))
+            if source is not None:
+                _quantize(source, staged, backend, precision, imgsz)
+                logger.info("Quantized %s to %s", source, target)
+            else:
+                _export(model_path, staged, backend, precision, imgsz)
+                logger.info("Exported %s to %s", model_path, target)
+            os.rename(staged, target)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+    return target
+
+
+def _export(model_path, target, backend, precision, imgsz):
+    from ultralytics import YOLO
+
+    register_safe_globals()
+    # ultralytics writes the export next to the checkpoint, so export a private copy of it
+    checkpoint = shutil.copy2(model_path, os.path.dirname(target))
+    # Dynamic axes let the scheduler send micro-batches of any size
+    dynamic = backend in ("onnx", "openvino")
+    exported = YOLO(checkpoint).export(format=BACKENDS[backend][0], imgsz=imgsz, dynamic=dynamic,
+                                       half=precision == "fp16")
+    shutil.move(str(exported), target)
+
+
+def _quantize(source, target, backend, precision, imgsz):
+    if precision == "int8-dynamic":
+        quantize_onnx_dynamic(source, target)
+        return
+    frames = load_calibration_frames()
+    if not frames:
+        raise ValueError(f"{precision} needs calibration frames in {settings.CALIBRATION_DIR!r}")
+    if backend == "onnx":
+        quantize_onnx_static(source, target, frames, imgsz)
+    else:
+        quantize_openvino_static(source, target, frames, imgsz)
+
+
+def load_backend(model_path, backend, precision="fp32", imgsz=settings.INFERENCE_SIZE):
+    """Load a pose model running on the given backend and precision
+
+    ultralytics loads exports lazily, on the first frame, so the runtime reads
+    the export here first to surface a broken artifact as CorruptExport now.
+    """
+    from ultralytics import YOLO
+
+    if backend == "pytorch":
+        register_safe_globals()
+        return YOLO(model_path)
+    path = export_model(model_path, backend, imgsz, precision=precision)
+    with _export_lock(path, shared=True):
+        read_export(path, backend)
+    return YOLO(path, task="pose")
+
+
+def load_pose_model(model_path, backend=settings.POSE_BACKEND, precision=settings.POSE_PRECISION,
+                    imgsz=settings.INFERENCE_SIZE):
+    """Load the pose model on the requested backend, falling back to PyTorch
+
+    Returns the model and a label of the backend and precision actually used.
+    """
+    supported = PRECISIONS.get(precision, ())
+    if backend == "auto":
+        installed = available_backends()
+        candidates = [name for name in AUTO_ORDER if name in installed and name in supported]
+    elif backend in BACKENDS:
+        candidates = [backend]
+    else:
+        if backend != "pytorch":
+            logger.warning("Unknown pose backend %r, using PyTorch", backend)
+        candidates = []
+
+    for name in candidates:
+        try:
+            return load_backend(model_path, name, precision, imgsz), f"{name}/{precision}"
+        except CorruptExport as exc:
+            logger.warning("%s, deleting it and trying the next backend", exc)
+            # Otherwise the corrupt export would fail the same way on every start
+            with contextlib.suppress(OSError):
+                discard_export(exc.path, name)
+        except Exception:
+            logger.warning("Could not load pose model on %s/%s, trying the next backend",
+                           name, precision, exc_info=True)
+    return load_backend(model_path, "pytorch"), "pytorch"
@@ -0,0 +1,44 @@
+"""
+Workout progress chart as a Streamlit component that updates in place.
+
+st.plotly_chart rebuilds and resends the whole figure on every rerun. This
+component builds the figure once in the browser when it mounts; each rerun
+only sends the burned and goal calories, which the browser applies with
+Plotly.restyle, at most a few times per second. plotly.js is not committed:
+the bundle that ships with the pinned plotly package is copied into the
+frontend directory on import and served by Streamlit along with the component.
+"""
+import importlib.util
+import os
+import shutil
+
+import streamlit.components.v1 as components
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "progress_chart_frontend")
+
+
+def install_plotly_js(frontend_dir=FRONTEND_DIR):
+    """Copy plotly/package_data/plotly.min.js next to index.html unless the same file is there"""
+    spec = importlib.util.find_spec("plotly")
+    if spec is None:
+        raise ImportError("the progress chart serves plotly.js from the plotly package; pip install plotly")
+    source = os.path.join(spec.submodule_search_locations[0], "package_data", "plotly.min.js")
+    target = os.path.join(frontend_dir, "plotly.min.js")
+    if os.path.exists(target) and os.path.getsize(target) == os.path.getsize(source):
+        return target
+    # Copied under a private name and renamed, so a page never loads half a file
+    staged = f"{target}.{os.getpid()}.tmp"
+    shutil.copyfile(source, staged)
+    os.replace(staged, target)
+    return target
+
+
+install_plotly_js()
+_progress_chart = components.declare_component("progress_chart", path=FRONTEND_DIR)
+
+
+def progress_chart(calories_burned, goal_calories, key="progress_chart"):
+    """Show burned against goal calories; key keeps the same chart across reruns"""
+    # Rounded to what the chart can show, so reruns with no visible change send identical values
+    _progress_chart(burned=round(float(calories_burned), 2), goal=round(float(goal_calories), 2),
+                    key=key, default=None)
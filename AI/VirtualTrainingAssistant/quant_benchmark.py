@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Accuracy-vs-speed benchmark for reduced-precision pose model variants.
+
+Replays recorded sets through the FP32 PyTorch model and through each variant,
+then reports per exercise how far the variant drifts from the reference (rep
+count agreement, joint-angle error, detection agreement) and how much faster
+it runs.
+
+Recordings are grouped in one directory per exercise:
+
+    recordings/left_dumbbell/set1.mp4
+    recordings/lateral_raises/set1.mp4
+
+Usage:
+    python quant_benchmark.py recordings --variants onnx/fp32 onnx/int8-dynamic onnx/int8-static openvino/fp16
+"""
+import argparse
+import glob
+import json
+import os
+import time
+
+import numpy as np
+
+import settings
+from exercises import EXERCISES, count_rep
+from inference_server import first_person_keypoints
+from model_registry import DEFAULT_MODEL_PATH, SharedPoseModel
+from pose_backends import load_backend
+from quantization import VIDEO_EXTENSIONS, read_video_frames
+
+REFERENCE = "pytorch/fp32"
+
+
+def exercise_slug(app_mode):
+    return app_mode.lower().replace(" ", "_")
+
+
+def find_recordings(root):
+    """Map each exercise to the recordings in its directory"""
+    recordings = {}
+    for app_mode in EXERCISES:
+        files = sorted(glob.glob(os.path.join(root, exercise_slug(app_mode), "*")))
+        videos = [f for f in files if f.lower().endswith(VIDEO_EXTENSIONS)]
+        if videos:
+            recordings[app_mode] = videos
+    return recordings
+
+
+def analyze_recording(model, path, app_mode, imgsz, max_frames=None):
+    """Run one recording through a model and the rep state machine"""
+    counter, direction = 0, "up"
+    angles, latencies = [], []
+    for frame in read_video_frames(path, limit=max_frames):
+        start = time.perf_counter()
+        result = model(frame, imgsz=imgsz)[0]
+        latencies.append(time.perf_counter() - start)
+
+        keypoints = first_person_keypoints(result)
+        if keypoints is None or len(keypoints) < 10:
+            angles.append(np.nan)
+            continue
+        angle, counter, direction = count_rep(keypoints, app_mode, counter, direction)
+        angles.append(angle)
+    return {"reps": counter, "angles": np.array(angles), "latencies": np.array(latencies)}
+
+
+def compare(reference, candidate):
+    """Summarize a variant's runs of one exercise against the reference runs"""
+    ref_angles = np.concatenate([run["angles"] for run in reference])
+    angles = np.concatenate([run["angles"] for run in candidate])
+    ref_detected, detected = ~np.isnan(ref_angles), ~np.isnan(angles)
+    both = ref_detected & detected
+
+    ref_latency = np.concatenate([run["latencies"] for run in reference]).mean()
+    latency = np.concatenate([run["latencies"] for run in candidate]).mean()
+    rep_errors = [abs(run["reps"] - ref["reps"]) for run, ref in zip(candidate, reference)]
+    return {
+        "reps": sum(run["reps"] for run in candidate),
+        "reference_reps": sum(run["reps"] for run in reference),
+        "rep_agreement": float(np.mean([error == 0 for error in rep_errors])),
+        "mean_rep_error": float(np.mean(rep_errors)),
+        "mean_angle_error": float(np.abs(angles[both] - ref_angles[both]).mean()) if both.any() else None,
+        "detection_agreement": float(np.mean(ref_detected == detected)),
+        "latency_ms": float(latency * 1000),
+        "fps": float(1 / latency),
+        "speedup": float(ref_latency / latency),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recordings", help="directory with one subdirectory of videos per exercise")
+    parser.add_argument("--variants", nargs="+", default=["onnx/fp32", "onnx/int8-dynamic", "onnx/int8-static"],
+                        help="backend/precision pairs to compare against pytorch/fp32 "
+                             "(a backend alone means fp32)")
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH)
+    parser.add_argument("--imgsz", type=int, default=settings.INFERENCE_SIZE)
+    parser.add_argument("--max-frames", type=int, default=None, help="limit frames per recording")
+    parser.add_argument("--output", default="quant_benchmark.json")
+    args = parser.parse_args()
+
+    recordings = find_recordings(args.recordings)
+    if not recordings:
+        parser.error(f"no recordings found under {args.recordings} "
+                     f"(expected subdirectories: {', '.join(map(exercise_slug, EXERCISES))})")
+
+    runs = {}
+    for variant in [REFERENCE] + args.variants:
+        backend, _, precision = variant.partition("/")
+        precision = precision or "fp32"
+        variant = f"{backend}/{precision}"
+        if variant in runs:
+            continue
+        try:
+            model = SharedPoseModel(load_backend(args.model, backend, precision, args.imgsz), variant)
+            model.warm_up()
+        except Exception as exc:
+            print(f"Skipping {variant}: {exc}")
+            continue
+        runs[variant] = {
+            app_mode: [analyze_recording(model, path, app_mode, args.imgsz, args.max_frames) for path in paths]
+            for app_mode, paths in recordings.items()
+        }
+
+    if REFERENCE not in runs:
+        parser.error(f"could not load the {REFERENCE} reference model")
+
+    report = {
+        app_mode: {variant: compare(runs[REFERENCE][app_mode], runs[variant][app_mode]) for variant in runs}
+        for app_mode in recordings
+    }
+
+    header = f"{'Exercise':<18} {'Variant':<20} {'Reps':>9} {'Agree':>6} {'Angle err':>10} {'ms/frame':>9} {'Speedup':>8}"
+    print(header)
+    print("-" * len(header))
+    for app_mode, variants in report.items():
+        for variant, row in variants.items():
+            angle_error = "n/a" if row["mean_angle_error"] is None else f"{row['mean_angle_error']:.2f}°"
+            print(f"{app_mode:<18} {variant:<20} {row['reps']:>4}/{row['reference_reps']:<4} "
+                  f"{row['rep_agreement']:>6.0%} {angle_error:>10} {row['latency_ms']:>9.1f} {row['speedup']:>7.2f}x")
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
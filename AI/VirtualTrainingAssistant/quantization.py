@@ -0,0 +1,139 @@
+"""
+Reduced-precision variants of the exported pose model.
+
+  fp16          OpenVINO IR with FP16-compressed weights
+  int8-dynamic  ONNX with INT8 weights, activations quantized at run time
+  int8-static   ONNX (onnxruntime) or OpenVINO (NNCF) with INT8 weights and
+                activations, calibrated on recorded frames
+
+Quantization targets the convolutions, which carry almost all of the compute.
+The element-wise ops of the pose head, which mix pixel-scale coordinates with
+confidences, stay in floating point because they lose too much in INT8.
+"""
+import glob
+import logging
+import os
+import shutil
+
+import cv2
+import numpy as np
+
+import settings
+
+logger = logging.getLogger(__name__)
+
+# Precision -> backends that can run it
+PRECISIONS = {
+    "fp32": ("onnx", "openvino", "torchscript"),
+    "fp16": ("openvino",),
+    "int8-dynamic": ("onnx",),
+    "int8-static": ("onnx", "openvino"),
+}
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".webm")
+
+
+def read_video_frames(path, stride=1, limit=None):
+    """Yield every stride-th BGR frame of a video file"""
+    capture = cv2.VideoCapture(path)
+    try:
+        index = kept = 0
+        while limit is None or kept < limit:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            if index % stride == 0:
+                kept += 1
+                yield frame
+            index += 1
+    finally:
+        capture.release()
+
+
+def load_calibration_frames(path=settings.CALIBRATION_DIR, limit=settings.CALIBRATION_FRAMES):
+    """Load up to limit BGR frames from the images and videos in a directory"""
+    files = sorted(glob.glob(os.path.join(path, "**", "*"), recursive=True)) if path else []
+    images = [f for f in files if f.lower().endswith(IMAGE_EXTENSIONS)]
+    videos = [f for f in files if f.lower().endswith(VIDEO_EXTENSIONS)]
+
+    frames = [frame for frame in map(cv2.imread, images[:limit]) if frame is not None]
+    for video in videos:
+        if len(frames) >= limit:
+            break
+        # Sample sparsely so consecutive, near-identical frames do not dominate
+        frames.extend(read_video_frames(video, stride=15, limit=limit - len(frames)))
+    return frames
+
+
+def to_model_input(frame, imgsz=settings.INFERENCE_SIZE):
+    """Letterbox a BGR frame the way ultralytics does and return a 1x3xHxW float tensor"""
+    height, width = frame.shape[:2]
+    scale = min(imgsz / height, imgsz / width)
+    resized_w, resized_h = round(width * scale), round(height * scale)
+    if (resized_w, resized_h) != (width, height):
+        frame = cv2.resize(frame, (resized_w, resized_h), interpolation=cv2.INTER_LINEAR)
+
+    canvas = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    top, left = (imgsz - resized_h) // 2, (imgsz - resized_w) // 2
+    canvas[top:top + resized_h, left:left + resized_w] = frame
+    return (canvas[:, :, ::-1].transpose(2, 0, 1)[None] / 255.0).astype(np.float32)
+
+
+def _copy_onnx_metadata(source, target):
+    # ultralytics reads task, stride and keypoint shape from the model metadata
+    import onnx
+
+    original = onnx.load(source, load_external_data=False)
+    quantized = onnx.load(target)
+    del quantized.metadata_props[:]
+    quantized.metadata_props.extend(original.metadata_props)
+    onnx.save(quantized, target)
+
+
+def quantize_onnx_dynamic(source, target):
+    """Write an ONNX model with dynamically quantized INT8 convolutions"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(source, target, op_types_to_quantize=["Conv"], weight_type=QuantType.QUInt8)
+    _copy_onnx_metadata(source, target)
+    return target
+
+
+def quantize_onnx_static(source, target, frames, imgsz=settings.INFERENCE_SIZE):
+    """Write an ONNX model with INT8 convolutions calibrated on frames"""
+    from onnxruntime.quantization import (CalibrationDataReader, QuantFormat, QuantType,
+                                          quantize_static)
+
+    class FrameReader(CalibrationDataReader):
+        def __init__(self):
+            self._frames = iter(frames)
+
+        def get_next(self):
+            frame = next(self._frames, None)
+            return None if frame is None else {"images": to_model_input(frame, imgsz)}
+
+    quantize_static(source, target, FrameReader(), quant_format=QuantFormat.QDQ,
+                    op_types_to_quantize=["Conv"], per_channel=True,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+    _copy_onnx_metadata(source, target)
+    return target
+
+
+def quantize_openvino_static(source_dir, target_dir, frames, imgsz=settings.INFERENCE_SIZE):
+    """Write an OpenVINO IR with INT8 convolutions calibrated on frames (needs nncf)"""
+    import nncf
+    import openvino as ov
+
+    xml = glob.glob(os.path.join(source_dir, "*.xml"))[0]
+    model = ov.Core().read_model(xml)
+    dataset = nncf.Dataset(frames, lambda frame: to_model_input(frame, imgsz))
+    quantized = nncf.quantize(model, dataset, preset=nncf.QuantizationPreset.MIXED,
+                              ignored_scope=nncf.IgnoredScope(types=["Multiply", "Subtract", "Sigmoid"], validate=False),
+                              subset_size=len(frames))
+
+    os.makedirs(target_dir, exist_ok=True)
+    ov.save_model(quantized, os.path.join(target_dir, os.path.basename(xml)))
+    for extra in glob.glob(os.path.join(source_dir, "*.yaml")):
+        shutil.copy(extra, target_dir)
+    return target_dir
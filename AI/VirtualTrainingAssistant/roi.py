@@ -0,0 +1,85 @@
+"""
+Region-of-interest cropping and downscaling in front of pose inference.
+
+The person's bounding box from the previous detection (plus a margin) is cut
+out of the full frame and downscaled so its longest side is at most
+INFERENCE_SIZE. Keypoints from the model are mapped back to full-frame
+coordinates. When tracking is lost the next frame is run full-frame.
+
+The crop is a view of the frame, and downscaling writes into a buffer
+allocated once per session, so preparing a frame allocates no pixels. The
+frame goes to the model as uint8 BGR, which ultralytics letterboxes and
+converts in its own preprocessing. Handing it a float tensor instead would
+skip that, but ultralytics then converts the tensor back into an image for
+its results, which costs more than it saves.
+"""
+import cv2
+import numpy as np
+
+import settings
+
+# Keypoints below this confidence do not contribute to the tracked box
+MIN_KEYPOINT_CONFIDENCE = 0.3
+
+# Minimum padding around the box, as a fraction of the frame size
+MIN_PAD_FRACTION = 0.05
+
+# Tracking is considered lost when fewer keypoints than this are confident
+MIN_TRACKED_KEYPOINTS = 4
+
+
+class RoiCropper:
+    """Per-session person tracker that crops and rescales frames for inference"""
+
+    def __init__(self, inference_size=settings.INFERENCE_SIZE, margin=settings.ROI_MARGIN):
+        self.inference_size = inference_size
+        self.margin = margin
+        self.box = None  # (x0, y0, x1, y1) in full-frame pixels
+        # Every downscaled crop fits in it; each frame takes a view of the size it needs
+        self._resized = np.empty(inference_size * inference_size * 3, dtype=np.uint8)
+
+    def prepare(self, img):
+        """Return the model input for a frame and the transform to undo it
+
+        A downscaled input is overwritten by the next call, so it must be consumed first.
+        """
+        height, width = img.shape[:2]
+        x0, y0, x1, y1 = self.box if self.box is not None else (0, 0, width, height)
+        crop = img[y0:y1, x0:x1]
+
+        scale = min(1.0, self.inference_size / max(crop.shape[:2]))
+        if scale < 1.0:
+            resized_width = min(self.inference_size, max(1, round(crop.shape[1] * scale)))
+            resized_height = min(self.inference_size, max(1, round(crop.shape[0] * scale)))
+            resized = self._resized[:resized_height * resized_width * 3].reshape(resized_height, resized_width, 3)
+            crop = cv2.resize(crop, (resized_width, resized_height), dst=resized, interpolation=cv2.INTER_AREA)
+        return crop, (x0, y0, scale, width, height)
+
+    def restore(self, keypoints, transform):
+        """Map model keypoints back to the full frame and update the tracked box"""
+        if keypoints is None:
+            self.box = None
+            return None
+
+        x0, y0, scale, width, height = transform
+        keypoints = keypoints.copy()
+        keypoints[:, :2] = keypoints[:, :2] / scale + (x0, y0)
+        self._track(keypoints, width, height)
+        return keypoints
+
+    def _track(self, keypoints, width, height):
+        confident = keypoints[keypoints[:, 2] >= MIN_KEYPOINT_CONFIDENCE, :2]
+        if len(confident) < MIN_TRACKED_KEYPOINTS:
+            self.box = None
+            return
+
+        (left, top), (right, bottom) = confident.min(axis=0), confident.max(axis=0)
+        pad_x = max((right - left) * self.margin, width * MIN_PAD_FRACTION)
+        pad_y = max((bottom - top) * self.margin, height * MIN_PAD_FRACTION)
+        box = (
+            int(np.clip(left - pad_x, 0, width - 1)),
+            int(np.clip(top - pad_y, 0, height - 1)),
+            int(np.clip(right + pad_x, 1, width)),
+            int(np.clip(bottom + pad_y, 1, height)),
+        )
+        self.box = box if box[2] > box[0] and box[3] > box[1] else None
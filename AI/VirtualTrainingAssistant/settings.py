@@ -0,0 +1,107 @@
+"""
+Runtime settings for the Virtual Training Assistant.
+
+Every value can be overridden with an environment variable of the same name
+prefixed with VTA_, e.g. VTA_MAX_BATCH_SIZE=4.
+"""
+import os
+
+
+def _env_int(name, default):
+    value = os.environ.get(f"VTA_{name}")
+    return int(value) if value else default
+
+
+def _env_str(name, default):
+    return os.environ.get(f"VTA_{name}") or default
+
+
+def _env_float(name, default):
+    value = os.environ.get(f"VTA_{name}")
+    return float(value) if value else default
+
+
+# Start importing the video stack and loading the pose model in the background
+# when the first page is served (0 waits until an exercise is opened)
+PRELOAD = _env_int("PRELOAD", 1) == 1
+
+# Level of the app's own log messages on stderr; other libraries log warnings only
+LOG_LEVEL = _env_str("LOG_LEVEL", "INFO").upper()
+
+# Cross-session inference batching
+MAX_BATCH_SIZE = _env_int("MAX_BATCH_SIZE", 8)
+MAX_BATCH_WAIT_MS = _env_float("MAX_BATCH_WAIT_MS", 10)
+
+# Inference worker processes: with INFERENCE_WORKERS > 0 the pose model runs in
+# that many processes, which receive frames through shared memory, instead of
+# in the Streamlit process. WORKER_SLOTS frames can be in flight per worker;
+# WORKER_THREADS is the torch thread count per worker (0 splits the cores evenly).
+INFERENCE_WORKERS = _env_int("INFERENCE_WORKERS", 0)
+WORKER_SLOTS = _env_int("WORKER_SLOTS", 4)
+WORKER_THREADS = _env_int("WORKER_THREADS", 0)
+
+# Frame skipping: run pose inference every N frames, or adaptively to stay
+# within a per-frame latency budget (0 disables the adaptive schedule)
+DETECT_EVERY = _env_int("DETECT_EVERY", 1)
+LATENCY_BUDGET_MS = _env_float("LATENCY_BUDGET_MS", 0)
+MAX_DETECT_INTERVAL = _env_int("MAX_DETECT_INTERVAL", 6)
+
+# Region-of-interest cropping: the tracked person box (plus margin, as a
+# fraction of the box size) is downscaled to at most INFERENCE_SIZE pixels
+INFERENCE_SIZE = _env_int("INFERENCE_SIZE", 640)
+ROI_MARGIN = _env_float("ROI_MARGIN", 0.25)
+
+# Inference backend: auto, pytorch, onnx, openvino or torchscript. Exported
+# models are cached in EXPORT_DIR.
+POSE_BACKEND = _env_str("POSE_BACKEND", "auto").lower()
+EXPORT_DIR = _env_str("EXPORT_DIR", "exports")
+
+# Exported model precision: fp32, fp16, int8-dynamic or int8-static. Static
+# INT8 is calibrated on up to CALIBRATION_FRAMES frames from CALIBRATION_DIR.
+POSE_PRECISION = _env_str("POSE_PRECISION", "fp32").lower()
+CALIBRATION_DIR = _env_str("CALIBRATION_DIR", "calibration")
+CALIBRATION_FRAMES = _env_int("CALIBRATION_FRAMES", 100)
+
+# Draw the overlay on a separate thread, overlapping with inference of the
+# next frame (adds one frame of display delay)
+ASYNC_OVERLAY = _env_int("ASYNC_OVERLAY", 0) == 1
+
+# Keypoints below this confidence neither move the rep counter nor trigger form feedback
+MIN_KEYPOINT_CONFIDENCE = _env_float("MIN_KEYPOINT_CONFIDENCE", 0.5)
+
+# Keypoint smoothing (One-Euro filter): cutoff in Hz at rest, how fast it
+# rises with speed (per pixel/s), and the cutoff for the speed estimate.
+# Exercises can override these with a "smoothing" entry in exercises.json.
+SMOOTHING = _env_int("SMOOTHING", 1) == 1
+SMOOTHING_MIN_CUTOFF = _env_float("SMOOTHING_MIN_CUTOFF", 1.0)
+SMOOTHING_BETA = _env_float("SMOOTHING_BETA", 0.01)
+SMOOTHING_D_CUTOFF = _env_float("SMOOTHING_D_CUTOFF", 1.0)
+
+# Per-session telemetry ring buffers: the most recent TELEMETRY_FRAMES analyzed
+# frames and TELEMETRY_REPS rep events are kept
+TELEMETRY_FRAMES = _env_int("TELEMETRY_FRAMES", 1800)
+TELEMETRY_REPS = _env_int("TELEMETRY_REPS", 500)
+
+# Staged frame pipeline: conversion, inference, rep/form analysis and
+# annotation each on their own thread, with drop-oldest queues of
+# PIPELINE_QUEUE_SIZE frames between them. recv waits up to PIPELINE_WAIT_MS
+# for a finished frame before repeating the previous one.
+PIPELINE = _env_int("PIPELINE", 0) == 1
+PIPELINE_QUEUE_SIZE = _env_int("PIPELINE_QUEUE_SIZE", 2)
+PIPELINE_WAIT_MS = _env_float("PIPELINE_WAIT_MS", 20)
+
+# How often (in seconds) the workout summary refreshes itself while streaming,
+# and how many seconds of the tracked joint angle it charts
+SUMMARY_REFRESH_SECONDS = _env_float("SUMMARY_REFRESH_SECONDS", 1.0)
+ANGLE_CHART_SECONDS = _env_float("ANGLE_CHART_SECONDS", 10.0)
+
+# Prometheus-style metrics at http://METRICS_HOST:METRICS_PORT/metrics (port 0
+# disables the endpoint). The endpoint has no authentication, so it only listens
+# on loopback unless METRICS_HOST opts in to another address. DEBUG_PANEL=1 also
+# shows the metrics in the sidebar.
+METRICS_PORT = _env_int("METRICS_PORT", 9090)
+METRICS_HOST = _env_str("METRICS_HOST", "127.0.0.1")
+DEBUG_PANEL = _env_int("DEBUG_PANEL", 0) == 1
+
+# Exercise definitions (joints, rep thresholds, form rules, calories)
+EXERCISES_FILE = _env_str("EXERCISES_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "exercises.json"))
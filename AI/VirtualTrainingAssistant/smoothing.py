@@ -0,0 +1,75 @@
+"""
+Temporal keypoint smoothing with a confidence-weighted One-Euro filter.
+
+The One-Euro filter is a low-pass filter whose cutoff rises with speed:
+slow movements (holding a position near a rep threshold) are smoothed
+heavily, which removes the jitter that causes double counts, while fast
+movements pass with little lag. Each keypoint's smoothing factor is further
+scaled by its detection confidence, so uncertain keypoints move less.
+
+The filter keeps only the previous estimate and speed per keypoint, so its
+memory is constant per session. Angles derived from the smoothed keypoints
+are smoothed with them.
+"""
+import numpy as np
+
+import settings
+
+# A gap longer than this (lost person, stalled stream) restarts the filter
+MAX_GAP_SECONDS = 1.0
+
+
+def _alpha(cutoff, elapsed):
+    """Smoothing factor of a first-order low-pass filter at a cutoff frequency in Hz"""
+    tau = 1.0 / (2 * np.pi * cutoff)
+    return 1.0 / (1.0 + tau / elapsed)
+
+
+class KeypointSmoother:
+    """One-Euro filter over the (x, y) of a (17, 3) keypoint stream
+
+    min_cutoff (Hz) sets the smoothing at rest, beta how fast the cutoff rises
+    with speed (per pixel/s) and d_cutoff (Hz) the smoothing of the speed itself.
+    """
+
+    def __init__(self, min_cutoff=settings.SMOOTHING_MIN_CUTOFF, beta=settings.SMOOTHING_BETA,
+                 d_cutoff=settings.SMOOTHING_D_CUTOFF):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self):
+        self._position = None
+        self._speed = None
+        self._timestamp = None
+
+    def __call__(self, keypoints, timestamp):
+        """Return smoothed keypoints for a frame; None (no person) resets the filter"""
+        if keypoints is None:
+            self.reset()
+            return None
+
+        keypoints = np.array(keypoints, dtype=np.float64)
+        position = keypoints[:, :2]
+        elapsed = timestamp - self._timestamp if self._timestamp is not None else None
+        if elapsed is None or elapsed > MAX_GAP_SECONDS:
+            self._position, self._speed = position, np.zeros_like(position)
+            self._timestamp = timestamp
+            return keypoints
+        if elapsed <= 0:
+            keypoints[:, :2] = self._position
+            return keypoints
+
+        # Low-pass the speed, then let it raise each keypoint's cutoff
+        speed = (position - self._position) / elapsed
+        self._speed = self._speed + _alpha(self.d_cutoff, elapsed) * (speed - self._speed)
+        cutoff = self.min_cutoff + self.beta * np.linalg.norm(self._speed, axis=1)
+        alpha = _alpha(cutoff, elapsed)
+
+        # Uncertain keypoints follow their measurement less
+        alpha *= np.clip(keypoints[:, 2], 0.0, 1.0)
+        self._position = self._position + alpha[:, None] * (position - self._position)
+        self._timestamp = timestamp
+        keypoints[:, :2] = self._position
+        return keypoints
@@ -0,0 +1,102 @@
+"""
+Deferred loading of the trainer's heavy dependencies.
+
+The About page needs none of OpenCV, PyAV, streamlit-webrtc, PyTorch or the
+pose model. preload starts importing them and loading the model on a
+background thread as soon as the first page is served, so that page renders
+immediately. wait_until_ready blocks only when an exercise is opened before
+loading has finished. Import and load times are logged and kept in TIMINGS.
+
+Nothing configures logging under streamlit run, so configure_logging sends the
+app's messages at LOG_LEVEL to stderr, along with warnings from everything else.
+"""
+import importlib
+import logging
+import os
+import threading
+import time
+
+import settings
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Imported in this order, so each timing covers only what the earlier ones did not;
+# ultralytics brings in torch and video_processor the rest of the frame path
+HEAVY_MODULES = ("cv2", "av", "streamlit_webrtc", "ultralytics", "video_processor")
+
+TIMINGS = {}
+
+_ready = threading.Event()
+_error = None
+_thread = None
+_thread_lock = threading.Lock()
+
+
+class _AppLogFilter(logging.Filter):
+    """Passes the app's records, and other loggers' records from WARNING up"""
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or os.path.dirname(record.pathname) == APP_DIR
+
+
+def configure_logging(level=settings.LOG_LEVEL):
+    """Log the app's messages to stderr; safe to call on every rerun"""
+    root = logging.getLogger()
+    if any(isinstance(f, _AppLogFilter) for handler in root.handlers for f in handler.filters):
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    handler.addFilter(_AppLogFilter())
+    root.addHandler(handler)
+    level = logging.getLevelName(level)
+    if not isinstance(level, int):
+        level = logging.INFO
+    root.setLevel(min(root.level or logging.WARNING, level))
+
+
+def _timed(label, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    TIMINGS[label] = time.perf_counter() - start
+    logger.info("%s took %.2fs", label, TIMINGS[label])
+    return result
+
+
+def _load():
+    global _error
+    try:
+        for name in HEAVY_MODULES:
+            _timed(f"import {name}", importlib.import_module, name)
+        from inference_server import get_scheduler
+        _timed("pose model load", get_scheduler)
+    except Exception as exc:
+        _error = exc
+        logger.exception("Loading the pose pipeline failed")
+    finally:
+        _ready.set()
+
+
+def preload():
+    """Start importing and loading in the background, once per process"""
+    global _thread
+    if _thread is not None:
+        return
+    with _thread_lock:
+        if _thread is None:
+            _thread = threading.Thread(target=_load, name="preload", daemon=True)
+            _thread.start()
+
+
+def is_ready():
+    return _ready.is_set()
+
+
+def wait_until_ready(timeout=None):
+    """Block until the heavy modules and the model are loaded, starting the load if needed"""
+    preload()
+    if not _ready.wait(timeout):
+        raise TimeoutError("the pose pipeline is still loading")
+    if _error is not None:
+        raise _error
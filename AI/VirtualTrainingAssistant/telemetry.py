@@ -0,0 +1,120 @@
+"""
+Per-session workout telemetry in fixed-size ring buffers.
+
+Every analyzed frame appends its timestamp, tracked joint angle and keypoint
+confidence, and every counted rep appends a rep event, to preallocated
+NumPy arrays that wrap around. Memory stays the same however long a session
+runs. The session aggregates (rep tempo, range of motion, time under
+tension) are updated incrementally on each sample, so reading them is O(1)
+and never rescans the buffers. The workout summary also charts the last few
+seconds of angles straight from the frame buffer.
+"""
+import threading
+
+import numpy as np
+
+import settings
+
+# Frame gaps longer than this (lost person, dropped frames) do not count as time under tension
+MAX_FRAME_GAP_SECONDS = 0.5
+
+
+class RingBuffer:
+    """Fixed-capacity columns of samples that overwrite the oldest when full"""
+
+    def __init__(self, capacity, columns):
+        self.capacity = capacity
+        self.columns = {name: np.zeros(capacity, dtype=dtype) for name, dtype in columns.items()}
+        self.total = 0  # samples ever appended
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def append(self, **values):
+        index = self.total % self.capacity
+        for name, value in values.items():
+            self.columns[name][index] = value
+        self.total += 1
+
+    def values(self, name, last=None):
+        """The most recent samples of a column, oldest first"""
+        size = len(self) if last is None else min(last, len(self))
+        end = self.total % self.capacity
+        indices = np.arange(end - size, end) % self.capacity
+        return self.columns[name][indices]
+
+
+class SessionTelemetry:
+    """Angle history, rep events and running workout aggregates for one session"""
+
+    def __init__(self, exercise, frame_capacity=settings.TELEMETRY_FRAMES,
+                 rep_capacity=settings.TELEMETRY_REPS):
+        self.up_above = exercise.up_above
+        self.down_below = exercise.down_below
+        self.frames = RingBuffer(frame_capacity, {"time": np.float64, "angle": np.float32,
+                                                  "confidence": np.float32})
+        self.reps = RingBuffer(rep_capacity, {"time": np.float64, "duration": np.float32,
+                                              "range": np.float32})
+        self._lock = threading.Lock()
+
+        self.time_under_tension = 0.0
+        self._rep_seconds = 0.0
+        self._range_total = 0.0
+        self._confidence_total = 0.0
+        self._previous = None  # (time, angle) of the last frame
+        self._rep_start = None
+        self._rep_min = np.inf
+        self._rep_max = -np.inf
+
+    def record_frame(self, timestamp, angle, confidence):
+        with self._lock:
+            self.frames.append(time=timestamp, angle=angle, confidence=confidence)
+            self._confidence_total += confidence
+            if self._rep_start is None:
+                self._rep_start = timestamp
+            self._rep_min = min(self._rep_min, angle)
+            self._rep_max = max(self._rep_max, angle)
+
+            # Time under tension: time spent moving through the rep band rather than resting at either end
+            if self._previous is not None:
+                elapsed = timestamp - self._previous[0]
+                if 0 < elapsed <= MAX_FRAME_GAP_SECONDS and self.down_below <= self._previous[1] <= self.up_above:
+                    self.time_under_tension += elapsed
+            self._previous = (timestamp, angle)
+
+    def record_rep(self, timestamp):
+        """Close the current rep at timestamp"""
+        with self._lock:
+            start = self._rep_start if self._rep_start is not None else timestamp
+            duration = timestamp - start
+            angle_range = self._rep_max - self._rep_min if self._rep_max >= self._rep_min else 0.0
+            self.reps.append(time=timestamp, duration=duration, range=angle_range)
+            self._rep_seconds += duration
+            self._range_total += angle_range
+            # The next rep starts where this one ended, at the current angle
+            self._rep_start = timestamp
+            self._rep_min = self._rep_max = self._previous[1] if self._previous is not None else np.inf
+
+    def summary(self):
+        """Running aggregates over the whole session"""
+        with self._lock:
+            reps, frames = self.reps.total, self.frames.total
+            last = (self.reps.total - 1) % self.reps.capacity
+            return {
+                "reps": reps,
+                "tempo_seconds": float(self._rep_seconds / reps) if reps else None,
+                "last_rep_seconds": float(self.reps.columns["duration"][last]) if reps else None,
+                "range_of_motion": float(self._range_total / reps) if reps else None,
+                "time_under_tension": float(self.time_under_tension),
+                "mean_confidence": float(self._confidence_total / frames) if frames else None,
+            }
+
+    def recent_angles(self, seconds):
+        """(seconds before the latest frame, angles) of the frames in the last seconds, oldest first"""
+        with self._lock:
+            times, angles = self.frames.values("time"), self.frames.values("angle")
+        if not len(times):
+            return times, angles
+        ago = times - times[-1]
+        recent = ago >= -seconds
+        return ago[recent], angles[recent]
@@ -0,0 +1,172 @@
+"""
+Equivalence of the exercises.json rules with the original hand-written logic.
+
+The reference functions below are the rep state machine and form checks as
+they were written in vta.py before the exercise definitions moved to JSON.
+Random keypoint sequences are run through both, and the rep counts,
+directions, angles and feedback must match on every frame.
+
+Run with: python -m pytest test_exercises.py
+"""
+import json
+
+import numpy as np
+import pytest
+
+import settings
+from exercises import EXERCISES, EXERCISE_REGISTRY, check_form, count_rep, load_exercises
+
+FRAMES_PER_EXERCISE = 20000
+
+
+def calculate_angle(point1, point2, point3):
+    a, b, c = np.array(point1), np.array(point2), np.array(point3)
+    radians = np.arctan2(c[1] - b[1], c[0] - b[0]) - np.arctan2(a[1] - b[1], a[0] - b[0])
+    angle = np.abs(radians * 180.0 / np.pi)
+    if angle > 180.0:
+        angle = 360 - angle
+    return angle
+
+
+def _point(keypoints, index):
+    return int(keypoints[index][0]), int(keypoints[index][1])
+
+
+def reference_count_rep(keypoints, app_mode, counter, direction):
+    shoulder, elbow, wrist = (5, 7, 9) if app_mode != "Right Dumbbell" else (6, 8, 10)
+    angle = calculate_angle(_point(keypoints, shoulder), _point(keypoints, elbow), _point(keypoints, wrist))
+    if app_mode in ("Left Dumbbell", "Right Dumbbell"):
+        if angle > 160 and direction == "down":
+            direction = "up"
+        if angle < 60 and direction == "up":
+            counter += 1
+            direction = "down"
+    elif app_mode in ("Lateral Raises", "Front Raises"):
+        if angle > 160 and direction == "down":
+            direction = "up"
+        if angle < 30 and direction == "up":
+            counter += 1
+            direction = "down"
+    elif app_mode == "Triceps Kickbacks":
+        if angle < 30 and direction == "up":
+            direction = "down"
+        if angle > 160 and direction == "down":
+            counter += 1
+            direction = "up"
+    return angle, counter, direction
+
+
+def reference_check_form(keypoints, exercise_type, angle, direction):
+    feedback, feedback_type = "", "good"
+    if len(keypoints) < 17:
+        return "Make sure your whole body is visible", "bad"
+
+    if exercise_type in ("Left Dumbbell", "Right Dumbbell"):
+        left = exercise_type == "Left Dumbbell"
+        shoulder, elbow = _point(keypoints, 5 if left else 6), _point(keypoints, 7 if left else 8)
+        if elbow[0] < shoulder[0] - 30:
+            feedback, feedback_type = "Keep your elbow close to your body", "bad"
+        elif angle > 160 and direction == "down":
+            feedback, feedback_type = "Good form! Fully extend your arm", "good"
+        elif angle < 60 and direction == "up":
+            feedback, feedback_type = "Good contraction! Now lower slowly", "good"
+    elif exercise_type in ("Lateral Raises", "Front Raises"):
+        shoulder, wrist = _point(keypoints, 5), _point(keypoints, 9)
+        if wrist[1] < shoulder[1] - 50:
+            feedback, feedback_type = "Don't raise above shoulder level", "bad"
+        elif angle > 160 and direction == "down":
+            feedback, feedback_type = "Good starting position", "good"
+        elif angle < 30 and direction == "up":
+            feedback, feedback_type = "Perfect! Arms parallel to floor", "good"
+    elif exercise_type == "Triceps Kickbacks":
+        shoulder, elbow = _point(keypoints, 5), _point(keypoints, 7)
+        upper_arm_angle = calculate_angle((shoulder[0], shoulder[1] + 100), shoulder, elbow)
+        if upper_arm_angle < 45:
+            feedback, feedback_type = "Keep upper arm parallel to floor", "bad"
+        elif angle < 30 and direction == "up":
+            feedback, feedback_type = "Good extension! Now return slowly", "good"
+        elif angle > 160 and direction == "down":
+            feedback, feedback_type = "Good starting position", "good"
+    return feedback, feedback_type
+
+
+def random_keypoints(count, seed):
+    """Integer pixel keypoints, as the original code truncated them, with full confidence"""
+    rng = np.random.default_rng(seed)
+    keypoints = np.ones((count, 17, 3))
+    keypoints[..., 0] = rng.integers(0, 640, (count, 17))
+    keypoints[..., 1] = rng.integers(0, 480, (count, 17))
+    return keypoints
+
+
+@pytest.mark.parametrize("app_mode", EXERCISES)
+def test_rules_match_original_logic(app_mode):
+    keypoints = random_keypoints(FRAMES_PER_EXERCISE, seed=EXERCISES.index(app_mode))
+    counter = expected_counter = 0
+    direction = expected_direction = "up"
+    for frame in keypoints:
+        expected_angle, expected_counter, expected_direction = reference_count_rep(
+            frame, app_mode, expected_counter, expected_direction)
+        angle, counter, direction = count_rep(frame, app_mode, counter, direction)
+        assert angle == pytest.approx(expected_angle)
+        assert (counter, direction) == (expected_counter, expected_direction)
+        assert check_form(frame, app_mode, angle, direction) == reference_check_form(
+            frame, app_mode, expected_angle, expected_direction)
+    # The sequence must actually exercise the state machine
+    assert counter > 100
+
+
+@pytest.mark.parametrize("app_mode", EXERCISES)
+def test_batch_features_match_single_frames(app_mode):
+    exercise = EXERCISE_REGISTRY[app_mode]
+    keypoints = random_keypoints(50, seed=1)
+    batch = exercise.features(keypoints)
+    for i, frame in enumerate(keypoints):
+        for name, value in exercise.features(frame).items():
+            np.testing.assert_allclose(batch[name][i], value)
+
+
+def test_partial_keypoints_ask_for_the_whole_body():
+    keypoints = random_keypoints(1, seed=2)[0][:12]
+    assert check_form(keypoints, "Left Dumbbell", 90.0, "up") == ("Make sure your whole body is visible", "bad")
+
+
+def curl_keypoints(elbow_angle, confidence=1.0):
+    """Left arm hanging straight down from the shoulder, bent at the elbow by elbow_angle"""
+    keypoints = np.ones((17, 3))
+    keypoints[:, :2] = 300, 200
+    keypoints[5, :2] = 300, 100
+    radians = np.radians(elbow_angle)
+    keypoints[9, :2] = 300 - 100 * np.sin(radians), 200 - 100 * np.cos(radians)
+    keypoints[[5, 7, 9], 2] = confidence
+    return keypoints
+
+
+def test_low_confidence_frames_hold_the_rep_state():
+    exercise = EXERCISE_REGISTRY["Left Dumbbell"]
+    low = settings.MIN_KEYPOINT_CONFIDENCE / 2
+    counter, direction = 0, "down"
+    for angle, confidence in [(170, 1.0), (30, low), (170, low), (30, 1.0)]:
+        _, counter, direction = exercise.count_rep(exercise.features(curl_keypoints(angle, confidence)),
+                                                   counter, direction)
+    assert (counter, direction) == (1, "down")
+    features = exercise.features(curl_keypoints(30, low))
+    assert exercise.check_form(features, "up") == ("Make sure your whole body is visible", "bad")
+
+
+@pytest.mark.parametrize("change, message", [
+    (lambda spec: spec["geometry"]["angles"].update(elbow=["left_shoulder", "left_elbo", "left_wrist"]),
+     "unknown keypoint"),
+    (lambda spec: spec["rep"].update(angle="knee"), "not a declared angle"),
+    (lambda spec: spec["rep"].update(count_on="sideways"), "count_on"),
+    (lambda spec: spec["form"][0].update(feature="elbow_from_shoulder.z"), "unknown form feature"),
+    (lambda spec: spec["form"][0].update(above=10), "exactly one"),
+])
+def test_invalid_definitions_are_rejected(tmp_path, change, message):
+    with open(settings.EXERCISES_FILE) as f:
+        definitions = json.load(f)
+    change(definitions["Left Dumbbell"])
+    path = tmp_path / "exercises.json"
+    path.write_text(json.dumps(definitions))
+    with pytest.raises(ValueError, match=message):
+        load_exercises(str(path))
@@ -0,0 +1,65 @@
+"""
+Drop-oldest queues and the staged frame pipeline.
+
+Run with: python -m pytest test_pipeline.py
+"""
+from pipeline import DropOldestQueue, FramePipeline, _CLOSED
+
+
+def test_full_queue_drops_the_oldest_item():
+    drops = []
+    queue = DropOldestQueue(2, on_drop=lambda: drops.append(1))
+    for item in range(5):
+        queue.put(item)
+    assert (queue.dropped, len(drops)) == (3, 3)
+    assert [queue.get(timeout=0), queue.get(timeout=0)] == [3, 4]
+    assert queue.get(timeout=0) is None
+
+
+def test_get_newest_drops_older_items():
+    queue = DropOldestQueue(3)
+    for item in range(3):
+        queue.put(item)
+    assert queue.get_newest(timeout=0) == 2
+    assert queue.dropped == 2
+    assert len(queue) == 0
+
+
+def test_closed_queue_returns_remaining_items_first():
+    queue = DropOldestQueue(2)
+    queue.put("frame")
+    queue.close()
+    assert queue.get(timeout=0) == "frame"
+    assert queue.get(timeout=0) is _CLOSED
+
+
+def test_stage_error_drops_the_frame_and_keeps_running():
+    errors = []
+
+    def fail_on_odd(item):
+        if item % 2:
+            raise ValueError(item)
+        return item
+
+    pipeline = FramePipeline([("check", fail_on_odd), ("double", lambda item: item * 2)],
+                             queue_size=10, on_error=lambda: errors.append(1))
+    results = []
+    for item in range(7):
+        pipeline.put(item)
+        if item % 2 == 0:
+            results.append(pipeline.get(timeout=5))
+    pipeline.close()
+    assert results == [0, 4, 8, 12]
+    assert len(errors) == 3
+    stats = pipeline.stats()
+    assert (stats["check"]["errors"], stats["check"]["processed"]) == (3, 4)
+    assert stats["double"]["errors"] == 0
+
+
+def test_none_result_drops_the_frame():
+    pipeline = FramePipeline([("filter", lambda item: item if item > 1 else None)])
+    for item in range(3):
+        pipeline.put(item)
+    assert pipeline.get(timeout=5) == 2
+    pipeline.close()
+    assert pipeline.get(timeout=5) is None
@@ -0,0 +1,54 @@
+"""
+Per-session telemetry ring buffers and aggregates.
+
+Run with: python -m pytest test_telemetry.py
+"""
+import numpy as np
+import pytest
+
+from exercises import EXERCISE_REGISTRY
+from telemetry import RingBuffer, SessionTelemetry
+
+
+def test_ring_buffer_keeps_the_newest_samples():
+    buffer = RingBuffer(4, {"value": np.int64})
+    for value in range(10):
+        buffer.append(value=value)
+    assert (len(buffer), buffer.total) == (4, 10)
+    assert buffer.values("value").tolist() == [6, 7, 8, 9]
+    assert buffer.values("value", last=2).tolist() == [8, 9]
+
+
+def test_summary_aggregates_reps():
+    exercise = EXERCISE_REGISTRY["Left Dumbbell"]
+    telemetry = SessionTelemetry(exercise, frame_capacity=8, rep_capacity=2)
+    assert telemetry.summary()["tempo_seconds"] is None
+
+    # Three 2-second reps sweeping 170 -> 40 degrees at 10 frames per second
+    timestamp = 0.0
+    for _ in range(3):
+        for angle in np.linspace(170, 40, 20):
+            timestamp += 0.1
+            telemetry.record_frame(timestamp, angle, 0.9)
+        telemetry.record_rep(timestamp)
+
+    summary = telemetry.summary()
+    assert summary["reps"] == 3
+    assert summary["tempo_seconds"] == pytest.approx(2.0, abs=0.1)
+    assert summary["range_of_motion"] == pytest.approx(130, abs=1)
+    assert summary["mean_confidence"] == pytest.approx(0.9)
+    # Only the part of each sweep inside the rep band counts as time under tension
+    band = exercise.up_above - exercise.down_below
+    assert summary["time_under_tension"] == pytest.approx(6.0 * band / 130, abs=0.2)
+    # The buffers stay at their capacity however many samples arrive
+    assert (len(telemetry.frames), len(telemetry.reps)) == (8, 2)
+
+
+def test_recent_angles_cover_the_last_seconds():
+    telemetry = SessionTelemetry(EXERCISE_REGISTRY["Left Dumbbell"], frame_capacity=100)
+    assert len(telemetry.recent_angles(5)[1]) == 0
+    for i in range(50):
+        telemetry.record_frame(i * 0.5, float(i), 1.0)
+    seconds_ago, angles = telemetry.recent_angles(5)
+    assert seconds_ago.tolist() == [-5.0 + 0.5 * i for i in range(11)]
+    assert angles.tolist() == list(range(39, 50))
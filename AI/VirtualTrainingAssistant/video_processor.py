@@ -0,0 +1,201 @@
+"""
+Per-session frame processing for the live trainer.
+
+Each camera frame goes through four steps: conversion to a BGR array, pose
+inference (batched across sessions, with frame skipping and ROI cropping),
+the rep and form state machine, and annotation. By default recv runs them
+back to back. With VTA_PIPELINE=1 each step runs on its own thread with
+bounded drop-oldest queues in between, so consecutive frames overlap and a
+slow step drops frames instead of adding latency.
+"""
+import time
+import uuid
+from typing import NamedTuple, Optional
+
+import av
+from streamlit_webrtc import VideoProcessorBase
+
+import metrics
+import settings
+from exercises import EXERCISE_REGISTRY, check_form
+from inference_server import DROPPED, get_scheduler
+from keypoint_motion import KeypointInterpolator
+from overlay import AsyncOverlay, render as render_overlay
+from pipeline import FramePipeline
+from roi import RoiCropper
+from telemetry import SessionTelemetry
+
+
+class FrameJob:
+    """A frame and what the processing steps have derived from it so far"""
+
+    __slots__ = ("frame", "timestamp", "img", "keypoints", "hud")
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.timestamp = time.monotonic()
+        self.img = None
+        self.keypoints = None
+        self.hud = None
+
+
+class SessionSnapshot(NamedTuple):
+    """Immutable view of a session's state, replaced as a whole on every analyzed frame"""
+
+    counter: int = 0
+    direction: str = "up"
+    angle: Optional[float] = None
+    feedback: str = ""
+    feedback_type: str = ""
+    start_time: Optional[float] = None
+    telemetry: Optional[dict] = None
+
+
+class VideoProcessor(VideoProcessorBase):
+    def __init__(self, app_mode, scheduler=None):
+        # The live app shares the process-wide scheduler; offline tools may pass their own
+        self.scheduler = scheduler if scheduler is not None else get_scheduler()
+        self.session_id = uuid.uuid4().hex
+        self.motion = KeypointInterpolator()
+        self.roi = RoiCropper()
+        self.counter = 0
+        self.direction = "up"
+        self.feedback = ""
+        self.feedback_type = ""
+        self.start_time = None
+        self.app_mode = app_mode # Store app_mode as an instance variable
+        self.exercise = EXERCISE_REGISTRY[app_mode]
+        self.smoother = self.exercise.smoother()
+        self.telemetry = SessionTelemetry(self.exercise)
+        self.fps = 0.0
+        self._last_frame_time = None
+        self._ended = False
+
+        # Every step is timed into the vta_stage_seconds histogram
+        self._steps = [
+            (name, metrics.timed(metrics.STAGE_SECONDS.labels(name), step))
+            for name, step in (("convert", self._convert), ("infer", self._infer),
+                               ("analyze", self._analyze), ("annotate", self._annotate))
+        ]
+        self._encode_seconds = metrics.STAGE_SECONDS.labels("encode")
+        self.pipeline = None
+        self.overlay = None
+        if settings.PIPELINE:
+            # Annotation already has its own stage, so the overlay thread is not needed
+            self.pipeline = FramePipeline(self._steps, settings.PIPELINE_QUEUE_SIZE,
+                                          metrics.DROPPED_FRAMES.labels("pipeline").inc,
+                                          metrics.DROPPED_FRAMES.labels("error").inc)
+        elif settings.ASYNC_OVERLAY:
+            self.overlay = AsyncOverlay()
+        self._last_output = None
+        # Readers on other threads take this reference once instead of reading
+        # fields that the analysis step is updating; rebinding it is atomic
+        self.snapshot = SessionSnapshot(telemetry=self.telemetry.summary())
+        metrics.ACTIVE_SESSIONS.inc()
+
+    def recv(self, frame):
+        received = time.perf_counter()
+        if self.start_time is None:
+            self.start_time = time.time()
+            self.snapshot = self.snapshot._replace(start_time=self.start_time)
+        self._track_fps(received)
+        metrics.FRAMES.inc()
+
+        job = FrameJob(frame)
+        if self.pipeline is None:
+            img = job
+            for _, step in self._steps:
+                img = step(img)  # the last step returns the annotated image
+        else:
+            # Hand the frame to the pipeline and send the newest finished one; while
+            # nothing new is ready, repeat the last output (or the camera frame at start)
+            self.pipeline.put(job)
+            img = self.pipeline.get(timeout=settings.PIPELINE_WAIT_MS / 1000)
+            if img is None:
+                img = self._last_output
+                if img is None:
+                    metrics.FRAME_SECONDS.observe(time.perf_counter() - received)
+                    return frame
+        self._last_output = img
+
+        # Output frames take the timestamps of the frame just received so they stay monotonic
+        encode_start = time.perf_counter()
+        output = av.VideoFrame.from_ndarray(img, format="bgr24")
+        output.pts = frame.pts
+        output.time_base = frame.time_base
+        finished = time.perf_counter()
+        self._encode_seconds.observe(finished - encode_start)
+        metrics.FRAME_SECONDS.observe(finished - received)
+        return output
+
+    def _track_fps(self, now):
+        if self._last_frame_time is not None and now > self._last_frame_time:
+            fps = 1.0 / (now - self._last_frame_time)
+            self.fps = fps if not self.fps else self.fps + 0.1 * (fps - self.fps)
+        self._last_frame_time = now
+
+    def _convert(self, job):
+        # One new array per frame, on purpose: swscale converts yuv420p faster than
+        # cv2.cvtColor can convert it into a reused buffer (PyAV cannot write into one),
+        # so only the ROI downscale in RoiCropper reuses a per-session buffer
+        job.img = job.frame.to_ndarray(format="bgr24")
+        return job
+
+    def _infer(self, job):
+        # Process frame with YOLO, batched together with the other sessions' frames.
+        # Skipped frames get keypoints extrapolated from the last detections.
+        if self.motion.should_detect():
+            inference_start = time.perf_counter()
+            roi_img, roi_transform = self.roi.prepare(job.img)
+            keypoints = self.scheduler.infer(self.session_id, roi_img)
+            if keypoints is not DROPPED:
+                job.keypoints = self.roi.restore(keypoints, roi_transform)
+                self.motion.update(job.keypoints, job.timestamp, time.perf_counter() - inference_start)
+                return job
+            # Dropped by a busy worker pool, not a lost person: keep the tracked box and
+            # extrapolate, so the next frame is not forced into a full-frame detection
+        job.keypoints = self.motion.predict(job.timestamp)
+        return job
+
+    def _analyze(self, job):
+        keypoints = job.keypoints
+        if self.smoother is not None:
+            # Filter out keypoint jitter that would cross the rep thresholds twice
+            keypoints = job.keypoints = self.smoother(keypoints, job.timestamp)
+        if keypoints is not None and len(keypoints) >= 10:  # Ensure keypoints are detected
+            # Exercise logic, on only the joints this exercise uses, computed in one vectorized pass
+            features = self.exercise.features(keypoints)
+            previous_count = self.counter
+            angle, self.counter, self.direction = self.exercise.count_rep(features, self.counter, self.direction)
+            if self.exercise.visible(features):
+                self.telemetry.record_frame(job.timestamp, angle, float(keypoints[:, 2].mean()))
+            if self.counter > previous_count:
+                self.telemetry.record_rep(job.timestamp)
+
+            # Check form and get feedback
+            self.feedback, self.feedback_type = check_form(keypoints, self.app_mode, angle, self.direction, features)
+            job.hud = (angle, self.counter, self.feedback, self.feedback_type)
+            self.snapshot = SessionSnapshot(self.counter, self.direction, float(angle), self.feedback,
+                                            self.feedback_type, self.start_time, self.telemetry.summary())
+        else:
+            job.keypoints = None
+        return job
+
+    def _annotate(self, job):
+        # Draw skeleton, angle, rep counter and feedback (on the overlay thread when enabled)
+        if self.overlay is not None:
+            return self.overlay.submit(job.img, job.keypoints, job.hud)
+        return render_overlay(job.img, job.keypoints, job.hud)
+
+    def pipeline_stats(self):
+        """Queue depth, dropped frames and latency per stage, empty when not pipelined"""
+        return self.pipeline.stats() if self.pipeline is not None else {}
+
+    def on_ended(self):
+        if not self._ended:
+            self._ended = True
+            metrics.ACTIVE_SESSIONS.dec()
+        if self.pipeline is not None:
+            self.pipeline.close()
+        if self.overlay is not None:
+            self.overlay.close()
@@ -1,8 +1,9 @@
 import streamlit as st
 import numpy as np
-import plotly.graph_objects as go
 import time
 import math
+from exercises import EXERCISES, EXERCISE_REGISTRY
+from progress_chart import progress_chart
 
 # Page configuration - MUST BE FIRST COMMAND
 st.set_page_config(page_title="Fitness Tracker", layout="wide")
@@ -48,7 +49,7 @@ if 'workout_started' not in st.session_state:
 # Sidebar for exercise selection
 app_mode = st.sidebar.selectbox(
     "Choose the exercise",
-    ["About", "Left Dumbbell", "Right Dumbbell", "Lateral Raises", "Front Raises", "Triceps Kickbacks"]
+    ["About"] + EXERCISES
 )
 
 if app_mode == "About":
@@ -79,51 +80,10 @@ else:
     st.markdown(f"## {app_mode}")
 
     # Display exercise instructions
-    if app_mode == "Left Dumbbell":
-        st.write("""
-        **Instructions:**
-        1. Stand straight with dumbbell in left hand
-        2. Keep elbow close to your torso
-        3. Curl the weight while keeping upper arm stationary
-        4. Only forearms should move
-        5. Slowly lower back to starting position
-        """)
-    elif app_mode == "Right Dumbbell":
-        st.write("""
-        **Instructions:**
-        1. Stand straight with dumbbell in right hand
-        2. Keep elbow close to your torso
-        3. Curl the weight while keeping upper arm stationary
-        4. Only forearms should move
-        5. Slowly lower back to starting position
-        """)
-    elif app_mode == "Lateral Raises":
-        st.write("""
-        **Instructions:**
-        1. Stand with dumbbells at sides
-        2. Keep slight bend in elbows
-        3. Raise arms to shoulder height
-        4. Don't raise above shoulders
-        5. Lower back slowly
-        """)
-    elif app_mode == "Front Raises":
-        st.write("""
-        **Instructions:**
-        1. Stand with dumbbells in front of thighs
-        2. Keep arms straight
-        3. Raise arms to shoulder height
-        4. Don't raise above shoulders
-        5. Lower back slowly
-        """)
-    elif app_mode == "Triceps Kickbacks":
-        st.write("""
-        **Instructions:**
-        1. Bend at waist with back straight
-        2. Keep upper arm parallel to floor
-        3. Extend arm backward
-        4. Fully straighten elbow
-        5. Return to starting position
-        """)
+    exercise = EXERCISE_REGISTRY[app_mode]
+    st.write("**Instructions:**\n" + "\n".join(
+        f"{step}. {instruction}" for step, instruction in enumerate(exercise.instructions, 1)
+    ))
 
     # User inputs
     weight = st.slider('What is your weight (kg)?', 20, 130, 40)
@@ -155,12 +115,7 @@ else:
         duration = time.time() - st.session_state.start_time
         
         # Different calorie calculations for different exercises
-        if app_mode in ["Left Dumbbell", "Right Dumbbell"]:
-            calories_burned = 0.25 * st.session_state.counter
-        elif app_mode in ["Lateral Raises", "Front Raises"]:
-            calories_burned = 0.3 * st.session_state.counter
-        elif app_mode == "Triceps Kickbacks":
-            calories_burned = 0.2 * st.session_state.counter
+        calories_burned = exercise.calories(st.session_state.counter)
         
         st.write("---")
         st.write("## Current Workout Stats")
@@ -173,41 +128,8 @@ else:
         with col3:
             st.metric("Calories", f"{calories_burned:.2f} kcal")
         
-        # Progress chart
-        fig = go.Figure()
-        fig.add_trace(go.Bar(
-            x=['Calories'],
-            y=[calories_burned],
-            name='Calories Burned',
-            marker_color='rgb(26, 118, 255)'
-        ))
-        fig.add_trace(go.Bar(
-            x=['Calories'],
-            y=[goal_calories],
-            name='Goal',
-            marker_color='rgb(55, 83, 109)'
-        ))
-
-        fig.update_layout(
-            title='Workout Progress',
-            xaxis_tickfont_size=14,
-            yaxis=dict(
-                title='Calories (kcal)',
-                title_font_size=16,
-                tickfont_size=14,
-            ),
-            legend=dict(
-                x=0,
-                y=1.0,
-                bgcolor='rgba(255, 255, 255, 0)',
-                bordercolor='rgba(255, 255, 255, 0)'
-            ),
-            barmode='group',
-            bargap=0.15,
-            bargroupgap=0.1
-        )
-
-        st.plotly_chart(fig)
+        # Progress chart, built once in the browser and updated with the new values only
+        progress_chart(calories_burned, goal_calories)
         
         # Feedback
         if calories_burned >= goal_calories:
@@ -0,0 +1,238 @@
+"""
+Pose inference in a pool of worker processes, for scaling past one interpreter.
+
+With INFERENCE_WORKERS > 0, get_scheduler returns a WorkerPool instead of the
+in-process InferenceScheduler. Each worker process loads its own pose model
+and has WORKER_SLOTS frame slots in a shared-memory block. To submit a frame,
+the Streamlit process copies it into a free slot of the least busy worker and
+sends only the slot number and frame size. The worker reads the frame in
+place and batches whatever its queue holds. It writes the keypoints into a
+matching shared-memory slot and reports the slot back. Pixels are never
+pickled, and the Streamlit process only routes frames and renders the
+results.
+
+Frames reach infer already cropped and downscaled by the ROI tracker, so a
+slot of INFERENCE_SIZE x INFERENCE_SIZE x 3 bytes fits any frame. When every
+slot is busy the frame is dropped and infer returns DROPPED.
+"""
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import CancelledError, Future
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import metrics
+import settings
+from inference_server import DROPPED, first_person_keypoints
+from model_registry import DEFAULT_MODEL_PATH
+
+logger = logging.getLogger(__name__)
+
+KEYPOINTS_SHAPE = (17, 3)
+READY_TIMEOUT_SECONDS = 300
+_POLL_SECONDS = 1.0
+
+
+def _slot_bytes(inference_size):
+    return inference_size * inference_size * 3
+
+
+def _serve(index, frames_name, keypoints_name, slots, requests, results, model_path, threads):
+    """Worker process: run batches of frames from shared memory through the pose model"""
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    from model_registry import get_pose_model
+
+    frames_memory = shared_memory.SharedMemory(frames_name)
+    keypoints_memory = shared_memory.SharedMemory(keypoints_name)
+    frames = np.ndarray((slots, _slot_bytes(settings.INFERENCE_SIZE)), np.uint8, frames_memory.buf)
+    keypoints = np.ndarray((slots, *KEYPOINTS_SHAPE), np.float32, keypoints_memory.buf)
+    model = get_pose_model(model_path)
+    results.put((index, "ready", None))
+
+    try:
+        while True:
+            batch = [requests.get()]
+            while len(batch) < settings.MAX_BATCH_SIZE:
+                try:
+                    batch.append(requests.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                break
+
+            start = time.perf_counter()
+            images = [frames[slot, :height * width * 3].reshape(height, width, 3) for slot, height, width in batch]
+            found = []
+            try:
+                for (slot, _, _), result in zip(batch, model(images, imgsz=settings.INFERENCE_SIZE)):
+                    points = first_person_keypoints(result)
+                    if points is not None:
+                        keypoints[slot] = points
+                    found.append(points is not None)
+            except Exception as exc:
+                logger.exception("Batched pose inference failed in worker %d", index)
+                results.put((index, "failed", ([slot for slot, _, _ in batch], repr(exc))))
+                continue
+            results.put((index, "done", ([slot for slot, _, _ in batch], found, time.perf_counter() - start)))
+    finally:
+        del frames, keypoints
+        frames_memory.close()
+        keypoints_memory.close()
+
+
+class _Worker:
+    def __init__(self, index, context, slots, results, model_path, threads):
+        self.index = index
+        self.frames_memory = shared_memory.SharedMemory(create=True, size=slots * _slot_bytes(settings.INFERENCE_SIZE))
+        self.keypoints_memory = shared_memory.SharedMemory(
+            create=True, size=slots * int(np.prod(KEYPOINTS_SHAPE)) * np.dtype(np.float32).itemsize)
+        self.frames = np.ndarray((slots, _slot_bytes(settings.INFERENCE_SIZE)), np.uint8, self.frames_memory.buf)
+        self.keypoints = np.ndarray((slots, *KEYPOINTS_SHAPE), np.float32, self.keypoints_memory.buf)
+        self.free = list(range(slots))
+        self.in_flight = {}  # slot -> Future
+        self.requests = context.Queue()
+        self.process = context.Process(
+            target=_serve, name=f"pose-worker-{index}", daemon=True,
+            args=(index, self.frames_memory.name, self.keypoints_memory.name, slots, self.requests, results,
+                  model_path, threads))
+        self.process.start()
+
+    def frame(self, slot, height, width):
+        return self.frames[slot, :height * width * 3].reshape(height, width, 3)
+
+    def release(self):
+        del self.frames, self.keypoints
+        for memory in (self.frames_memory, self.keypoints_memory):
+            memory.close()
+            memory.unlink()
+
+
+class WorkerPool:
+    """Routes frames to pose worker processes through shared memory; a drop-in for InferenceScheduler"""
+
+    def __init__(self, workers=settings.INFERENCE_WORKERS, model_path=DEFAULT_MODEL_PATH,
+                 slots=settings.WORKER_SLOTS, threads=settings.WORKER_THREADS):
+        threads = threads or max(1, (os.cpu_count() or 1) // workers)
+        self.dropped_frames = 0
+        self.batches_run = 0
+        self.frames_run = 0
+        self._lock = threading.Lock()
+        self._closed = False
+        # Spawned workers each load their own model instead of inheriting the parent's threads
+        context = multiprocessing.get_context("spawn")
+        self._results = context.Queue()
+        self._workers = [_Worker(index, context, slots, self._results, model_path, threads)
+                         for index in range(workers)]
+        self._wait_until_ready()
+        self._collector = threading.Thread(target=self._collect, name="pose-worker-results", daemon=True)
+        self._collector.start()
+
+    def _wait_until_ready(self):
+        waiting = {worker.index for worker in self._workers}
+        deadline = time.monotonic() + READY_TIMEOUT_SECONDS
+        while waiting:
+            try:
+                index, kind, _ = self._results.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                dead = [worker.index for worker in self._workers if not worker.process.is_alive()]
+                if dead or time.monotonic() > deadline:
+                    self.close()
+                    raise RuntimeError(f"pose workers {dead or sorted(waiting)} failed to start")
+                continue
+            if kind == "ready":
+                waiting.discard(index)
+
+    def submit(self, session_id, image):
+        """Copy a frame into a worker's shared memory and return a Future for its keypoints"""
+        future = Future()
+        height, width = image.shape[:2]
+        if height * width * 3 > _slot_bytes(settings.INFERENCE_SIZE):
+            raise ValueError(f"frame of {width}x{height} does not fit a {settings.INFERENCE_SIZE}px slot")
+
+        with self._lock:
+            ready = [worker for worker in self._workers if worker.free and worker.process.is_alive()]
+            if self._closed or not ready:
+                future.cancel()
+                self.dropped_frames += 1
+                metrics.DROPPED_FRAMES.labels("busy").inc()
+                return future
+            worker = min(ready, key=lambda candidate: len(candidate.in_flight))
+            slot = worker.free.pop()
+            worker.in_flight[slot] = future
+        future.set_running_or_notify_cancel()
+        # The only copy of the pixels: straight into the worker's slot
+        np.copyto(worker.frame(slot, height, width), image)
+        worker.requests.put((slot, height, width))
+        return future
+
+    def infer(self, session_id, image, timeout=None):
+        """Block until the frame's keypoints are ready; DROPPED if the frame was dropped"""
+        try:
+            return self.submit(session_id, image).result(timeout)
+        except CancelledError:
+            return DROPPED
+
+    def _collect(self):
+        while not self._closed:
+            try:
+                index, kind, payload = self._results.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                self._fail_dead_workers()
+                continue
+            except (EOFError, OSError):
+                break
+
+            worker = self._workers[index]
+            if kind == "done":
+                slots, found, seconds = payload
+                metrics.INFERENCE_BATCH_SECONDS.observe(seconds)
+                metrics.INFERENCE_BATCH_SIZE.observe(len(slots))
+                self.batches_run += 1
+                self.frames_run += len(slots)
+                outcomes = [(slot, worker.keypoints[slot].copy() if hit else None) for slot, hit in zip(slots, found)]
+            else:
+                slots, error = payload
+                outcomes = [(slot, RuntimeError(f"pose inference failed in worker {index}: {error}"))
+                            for slot in slots]
+
+            with self._lock:
+                futures = [(worker.in_flight.pop(slot), outcome) for slot, outcome in outcomes]
+                worker.free.extend(slots)
+            for future, outcome in futures:
+                if isinstance(outcome, Exception):
+                    future.set_exception(outcome)
+                else:
+                    future.set_result(outcome)
+
+    def _fail_dead_workers(self):
+        with self._lock:
+            for worker in self._workers:
+                if worker.in_flight and not worker.process.is_alive():
+                    logger.error("Pose worker %d exited with code %s", worker.index, worker.process.exitcode)
+                    for future in worker.in_flight.values():
+                        future.set_exception(RuntimeError(f"pose worker {worker.index} exited"))
+                    worker.in_flight.clear()
+
+    def close(self):
+        """Stop the workers and free their shared memory"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        for worker in self._workers:
+            if worker.process.is_alive():
+                worker.requests.put(None)
+        for worker in self._workers:
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            worker.release()
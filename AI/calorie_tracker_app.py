@@ -1,12 +1,60 @@
+import concurrent.futures
+
 import streamlit as st
 
+from food_recognition import get_food_recognizer
+from food_search import get_search_index
+from image_ingest import ImageRejected, ingest
+
 st.set_page_config(page_title="Calorie Tracker", layout="wide")
 
 st.title("Food Image Calorie Tracker")
 
 uploaded_file = st.file_uploader("Upload an image of your food", type=["jpg", "jpeg", "png"])
 
+image = None
 if uploaded_file is not None:
-    st.image(uploaded_file, caption="Uploaded Food Image", use_column_width=True)
+    try:
+        image = ingest(uploaded_file)
+    except ImageRejected as exc:
+        st.error(f"This image can't be used: {exc}")
+
+if image is not None:
+    st.image(image.thumbnail, caption="Uploaded Food Image", use_column_width=True)
     st.success("Image uploaded successfully!")
-    # Here we will add the logic for food recognition and calorie tracking
+
+    try:
+        with st.spinner("Recognizing food..."):
+            predictions = get_food_recognizer().recognize(image, timeout=60)
+    except FileNotFoundError as exc:
+        st.warning(f"Food recognition is unavailable: {exc}")
+    except concurrent.futures.TimeoutError:
+        st.warning("Food recognition is taking too long right now. Please try again in a moment.")
+    except Exception as exc:
+        st.warning(f"Food recognition failed for this image: {exc}")
+    else:
+        if predictions:
+            best = predictions[0]
+            st.subheader(best.description)
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Calories", f"{best.calories:.0f} kcal")
+            col2.metric("Protein", f"{best.protein_g:.1f} g")
+            col3.metric("Fat", f"{best.fat_g:.1f} g")
+            col4.metric("Carbs", f"{best.carbs_g:.1f} g")
+            st.caption(f"Per serving of {best.grams:.0f} g, {best.confidence:.0%} confidence")
+            if len(predictions) > 1:
+                st.write("Other possibilities: " + ", ".join(p.description for p in predictions[1:]))
+        else:
+            st.info("No food was recognized in this image.")
+
+st.subheader("Find a Food")
+query = st.text_input("Search foods by name", placeholder="e.g. butter with salt")
+
+if query:
+    index = get_search_index()
+    matches = index.search(query, k=10)
+    if matches:
+        food = st.selectbox("Matching foods", matches, format_func=lambda match: match.description)
+        st.metric("Calories per 100 g", f"{index.store.value(food.ndb_no, 'Energ_Kcal'):.0f} kcal")
+    else:
+        st.info("No foods match your search.")
@@ -0,0 +1,226 @@
+"""
+Food recognition for uploaded photos, shared by every calorie tracker session.
+
+One CPU classifier is loaded per process from local weights (FOOD_MODEL_PATH,
+an ultralytics classification checkpoint). Nothing is downloaded. Uploads
+from all sessions are queued and classified in micro-batches of up to
+FOOD_MAX_BATCH_SIZE images, waiting at most FOOD_MAX_BATCH_WAIT_MS for a
+batch to fill.
+
+Images arrive already reduced by image_ingest, as normalized tensors in the
+classifier's input layout, so a batch is stacked and run without
+ultralytics' own decode and resize. Results are memoized by the SHA-256 of
+the uploaded bytes in an LRU of FOOD_CACHE_SIZE entries. A re-upload, or the
+same photo from another session (even one still being classified), costs a
+dictionary lookup.
+
+Class labels are mapped to food1.csv rows by food_labels.json
+(FOOD_LABELS_PATH), which covers the food classes of the default ImageNet
+model. Labels it does not list, such as those of a food-specific classifier,
+are looked up with the food name search and kept only when the label's words
+name the food. Each
+prediction carries the calories and macros of one typical serving (GmWt_1).
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import NamedTuple
+
+import numpy as np
+
+from food_search import get_search_index, tokenize
+from image_ingest import TENSOR_SIZE
+from nutrient_store import get_nutrient_store
+
+logger = logging.getLogger(__name__)
+
+MODEL_PATH = os.environ.get("FOOD_MODEL_PATH", "yolov8n-cls.pt")
+LABELS_PATH = os.environ.get("FOOD_LABELS_PATH") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "food_labels.json")
+MAX_BATCH_SIZE = int(os.environ.get("FOOD_MAX_BATCH_SIZE", "8"))
+MAX_BATCH_WAIT_MS = int(os.environ.get("FOOD_MAX_BATCH_WAIT_MS", "20"))
+CACHE_SIZE = int(os.environ.get("FOOD_CACHE_SIZE", "512"))
+
+TOP_K = 3
+DEFAULT_SERVING_GRAMS = 100.0
+MACRO_COLUMNS = {"calories": "Energ_Kcal", "protein_g": "Protein_(g)", "fat_g": "Lipid_Tot_(g)",
+                 "carbs_g": "Carbohydrt_(g)"}
+
+_recognizer = None
+_recognizer_lock = threading.Lock()
+
+
+class FoodPrediction(NamedTuple):
+    label: str
+    confidence: float
+    ndb_no: int
+    description: str
+    grams: float
+    calories: float
+    protein_g: float
+    fat_g: float
+    carbs_g: float
+
+
+def load_classifier(model_path=MODEL_PATH):
+    """Load a local ultralytics classification checkpoint"""
+    if not os.path.exists(model_path):
+        # ultralytics would otherwise try to download the weights
+        raise FileNotFoundError(f"food classifier weights not found at {model_path!r}; set FOOD_MODEL_PATH")
+    from ultralytics import YOLO  # imported here so the page loads without torch
+    return YOLO(model_path, task="classify")
+
+
+def label_foods(names, labels_path=LABELS_PATH):
+    """Map class labels to NDB_No"""
+    known = {}
+    if os.path.exists(labels_path):
+        with open(labels_path, encoding="utf-8") as f:
+            known = {label: int(ndb_no) for label, ndb_no in json.load(f).items()}
+
+    foods = {label: known[label] for label in names if label in known}
+    unknown = [label for label in names if label not in known]
+    index = get_search_index() if unknown else None
+    for label in unknown:
+        words = set(tokenize(label.replace("_", " ")))
+        for match in index.search(" ".join(words), k=20, prefix=False):
+            described = tokenize(match.description)
+            # "hot dog" must not land on "PICKLE RELISH,HOT DOG"
+            if words and words <= set(described) and described[0] in words:
+                foods[label] = match.ndb_no
+                break
+    return foods
+
+
+class _Request:
+    def __init__(self, image):
+        self.key = image.key
+        self.tensor = image.tensor
+        self.submitted = time.monotonic()
+        self.future = Future()
+
+
+class FoodRecognizer:
+    """Classifies uploads from every session in micro-batches, memoized by content hash"""
+
+    def __init__(self, model, foods, store, max_batch_size=MAX_BATCH_SIZE,
+                 max_wait=MAX_BATCH_WAIT_MS / 1000, cache_size=CACHE_SIZE):
+        self.model = model
+        self.foods = foods
+        self.store = store
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.cache_size = cache_size
+        self.cache_hits = 0
+        self.batches_run = 0
+        self._cache = OrderedDict()  # content hash -> predictions, least recently used first
+        self._in_flight = {}         # content hash -> _Request
+        self._pending = []
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="food-recognition", daemon=True)
+        self._thread.start()
+
+    def submit(self, image):
+        """Queue an ingested image and return a Future for its predictions"""
+        key = image.key
+        with self._cond:
+            predictions = self._cache.get(key)
+            if predictions is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                future = Future()
+                future.set_result(predictions)
+                return future
+
+            request = self._in_flight.get(key)
+            if request is None:
+                request = _Request(image)
+                self._in_flight[key] = request
+                self._pending.append(request)
+                self._cond.notify()
+            return request.future
+
+    def recognize(self, image, timeout=None):
+        """Block until the image is classified; a list of FoodPrediction, best first"""
+        return self.submit(image).result(timeout)
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+
+            # Give other uploads a short window to join the batch
+            deadline = self._pending[0].submitted + self.max_wait
+            while len(self._pending) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch, self._pending = self._pending[:self.max_batch_size], self._pending[self.max_batch_size:]
+            return batch
+
+    def _finish(self, request, predictions=None, error=None):
+        with self._cond:
+            self._in_flight.pop(request.key, None)
+            if error is None:
+                self._cache[request.key] = predictions
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        if error is None:
+            request.future.set_result(predictions)
+        else:
+            request.future.set_exception(error)
+
+    def _run(self):
+        import torch  # already loaded with the classifier
+
+        while True:
+            requests = self._next_batch()
+            try:
+                batch = torch.from_numpy(np.stack([request.tensor for request in requests]))
+                results = self.model(batch, imgsz=TENSOR_SIZE, device="cpu", verbose=False)
+            except Exception as exc:
+                logger.exception("Batched food recognition failed")
+                for request in requests:
+                    self._finish(request, error=exc)
+                continue
+
+            self.batches_run += 1
+            for request, result in zip(requests, results):
+                self._finish(request, self._predictions(result))
+
+    def _predictions(self, result):
+        predictions = []
+        for label_id, confidence in zip(result.probs.top5, result.probs.top5conf.tolist()):
+            label = result.names[label_id]
+            ndb_no = self.foods.get(label)
+            if ndb_no is None:
+                continue
+            food = self.store.lookup(ndb_no)
+            grams = food["GmWt_1"] if food["GmWt_1"] > 0 else DEFAULT_SERVING_GRAMS
+            macros = {name: food[column] * grams / 100 for name, column in MACRO_COLUMNS.items()}
+            predictions.append(FoodPrediction(label, confidence, ndb_no, food["Shrt_Desc"], grams, **macros))
+            if len(predictions) == TOP_K:
+                break
+        return predictions
+
+
+def get_food_recognizer(model_path=MODEL_PATH):
+    """Return the process-wide recognizer, loading the classifier on first use"""
+    global _recognizer
+    if _recognizer is not None:
+        return _recognizer
+
+    with _recognizer_lock:
+        if _recognizer is None:
+            start = time.perf_counter()
+            model = load_classifier(model_path)
+            store = get_nutrient_store()
+            _recognizer = FoodRecognizer(model, label_foods(model.names.values()), store)
+            logger.info("Food classifier loaded in %.2fs", time.perf_counter() - start)
+        return _recognizer
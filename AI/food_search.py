@@ -0,0 +1,235 @@
+"""
+Fuzzy food-name search over the Shrt_Desc column of food1.csv.
+
+USDA short descriptions are comma-separated and abbreviated
+("BEEF,RND,EYE OF RND,LN,CKD,W/ SALT"), so descriptions and queries go
+through the same normalization: lower-case, "W/" -> with, "WO/" -> without,
+the common USDA abbreviations spelled out and plurals folded.
+
+The index is two inverted lists in CSR form (one flat postings array plus
+offsets):
+
+- token -> foods, with the vocabulary sorted so that every token sharing a
+  prefix is one contiguous slice; a type-ahead prefix is one slice.
+- trigram -> tokens, used to find vocabulary tokens close to a misspelled
+  query token.
+
+Scores are accumulated in one NumPy array per query and the top k are taken
+with argpartition, so a query costs well under a millisecond. The arrays are
+built once per food1.csv content hash next to the nutrient store's cache and
+memory-mapped afterwards.
+"""
+import os
+import re
+import sys
+import threading
+from typing import NamedTuple
+
+import numpy as np
+
+from nutrient_store import get_nutrient_store, load_arrays, write_arrays
+
+# Bump when tokenization or the index layout changes so old indexes are not reused
+INDEX_VERSION = 1
+
+ABBREVIATIONS = {
+    "bkd": "baked", "bld": "boiled", "bnless": "boneless", "brld": "broiled", "brsd": "braised",
+    "bev": "beverage", "chick": "chicken", "choc": "chocolate", "choic": "choice", "chs": "cheese",
+    "ckd": "cooked", "cnd": "canned", "cond": "condensed", "crm": "cream", "dom": "domestic",
+    "drk": "dark", "drnd": "drained", "drsng": "dressing", "flr": "flour", "frsh": "fresh",
+    "frz": "frozen", "h2o": "water", "imp": "imported", "inf": "infant", "inst": "instant",
+    "juc": "juice", "ln": "lean", "lo": "low", "lt": "light", "mxd": "mixed", "pdr": "powder",
+    "pk": "pack", "pln": "plain", "prep": "prepared", "reg": "regular", "rnd": "round",
+    "rst": "roast", "rstd": "roasted", "rte": "ready to eat", "sau": "sauce", "sel": "select",
+    "shldr": "shoulder", "skn": "skin", "sndwch": "sandwich", "sol": "solids", "stk": "steak",
+    "swt": "sweet", "swtnd": "sweetened", "unckd": "uncooked", "unprep": "unprepared",
+    "unswtnd": "unsweetened", "veg": "vegetable", "whl": "whole",
+}
+
+PREFIX_WEIGHT = 0.9   # a completed prefix scores a little below the exact word
+FUZZY_WEIGHT = 0.8    # scaled further by trigram similarity
+FUZZY_MIN_SIMILARITY = 0.5
+MAX_FUZZY_TOKENS = 5
+HEAD_BONUS = 0.5      # the first word of a description names the food ("BUTTER,...")
+LENGTH_PENALTY = 0.01  # among equal matches, prefer shorter, more generic foods
+
+_WITHOUT = re.compile(r"\bwo/|\bw/o\b")
+_WITH = re.compile(r"\bw/")
+_TOKEN = re.compile(r"[a-z0-9%]+")
+_index = None
+_index_lock = threading.Lock()
+
+
+class Match(NamedTuple):
+    ndb_no: int
+    description: str
+    score: float
+
+
+def _fold_plural(token):
+    if len(token) > 4 and token.endswith("oes"):
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text):
+    """Normalized search tokens of a description or query"""
+    text = _WITH.sub(" with ", _WITHOUT.sub(" without ", text.lower()))
+    tokens = []
+    for token in _TOKEN.findall(text):
+        tokens.extend(_fold_plural(word) for word in ABBREVIATIONS.get(token, token).split())
+    return tokens
+
+
+def trigrams(token, closed=True):
+    """Padded trigrams of a token; an open (prefix) token is not padded at the end"""
+    padded = f"${token}$" if closed else f"${token}"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _csr(lists, size):
+    """Flatten lists of ids into (offsets, postings)"""
+    offsets = np.zeros(size + 1, dtype=np.int32)
+    offsets[1:] = np.cumsum([len(ids) for ids in lists])
+    postings = np.fromiter((i for ids in lists for i in ids), dtype=np.int32, count=int(offsets[-1]))
+    return offsets, postings
+
+
+def build_index(store, index_path):
+    documents = [tokenize(description.decode("utf-8")) for description in store.descriptions]
+    vocabulary = sorted({token for tokens in documents for token in tokens})
+    token_id = {token: i for i, token in enumerate(vocabulary)}
+
+    foods = [[] for _ in vocabulary]
+    for row, tokens in enumerate(documents):
+        for token in dict.fromkeys(tokens):
+            foods[token_id[token]].append(row)
+    offsets, postings = _csr(foods, len(vocabulary))
+
+    grams = {}
+    for i, token in enumerate(vocabulary):
+        for gram in trigrams(token):
+            grams.setdefault(gram, []).append(i)
+    gram_keys = sorted(grams)
+    gram_offsets, gram_postings = _csr([grams[gram] for gram in gram_keys], len(gram_keys))
+
+    write_arrays(index_path, {
+        "vocabulary": np.array(vocabulary),
+        "offsets": offsets,
+        "postings": postings,
+        "gram_keys": np.array(gram_keys),
+        "gram_offsets": gram_offsets,
+        "gram_postings": gram_postings,
+        "token_grams": np.array([len(trigrams(token)) for token in vocabulary], dtype=np.int16),
+        "heads": np.array([token_id[tokens[0]] if tokens else -1 for tokens in documents], dtype=np.int32),
+        "lengths": np.array([len(tokens) for tokens in documents], dtype=np.int16),
+    }, {"version": INDEX_VERSION, "foods": len(documents)})
+
+
+class FoodSearchIndex:
+    def __init__(self, store, index_path):
+        self.store = store
+        arrays, _ = load_arrays(index_path, ("vocabulary", "offsets", "postings", "gram_keys", "gram_offsets",
+                                             "gram_postings", "token_grams", "heads", "lengths"))
+        self.vocabulary = arrays["vocabulary"]
+        self.offsets = arrays["offsets"]
+        self.postings = arrays["postings"]
+        self.gram_keys = arrays["gram_keys"]
+        self.gram_offsets = arrays["gram_offsets"]
+        self.gram_postings = arrays["gram_postings"]
+        self.token_grams = arrays["token_grams"]
+        self.heads = arrays["heads"]
+        self.penalty = arrays["lengths"] * np.float32(LENGTH_PENALTY)
+        self.foods = len(self.heads)
+
+    def _weight(self, quality, lo, hi):
+        # Inverse document frequency of everything in the token range
+        frequency = self.offsets[hi] - self.offsets[lo]
+        return quality * np.log1p(self.foods / max(frequency, 1))
+
+    def _fuzzy(self, token, closed):
+        """Vocabulary tokens sharing enough trigrams with token, as (id, similarity) pairs"""
+        grams = list(trigrams(token, closed))
+        found = np.searchsorted(self.gram_keys, grams)
+        candidates = [self.gram_postings[self.gram_offsets[i]:self.gram_offsets[i + 1]]
+                      for i, gram in zip(found, grams) if i < len(self.gram_keys) and self.gram_keys[i] == gram]
+        if not candidates:
+            return []
+        overlap = np.bincount(np.concatenate(candidates), minlength=len(self.vocabulary))
+        similarity = 2 * overlap / (len(grams) + self.token_grams)
+        best = np.flatnonzero(similarity >= FUZZY_MIN_SIMILARITY)
+        best = best[np.argsort(similarity[best])[::-1][:MAX_FUZZY_TOKENS]]
+        return [(int(i), float(similarity[i])) for i in best]
+
+    def _ranges(self, token, prefix):
+        """(lo, hi, weight) vocabulary ranges matching one query token, ascending by weight"""
+        lo = int(np.searchsorted(self.vocabulary, token))
+        exact = lo < len(self.vocabulary) and self.vocabulary[lo] == token
+        ranges = []
+        if prefix:
+            hi = int(np.searchsorted(self.vocabulary, token + chr(0x10FFFF)))
+            if hi > lo:
+                ranges.append((lo, hi, self._weight(PREFIX_WEIGHT, lo, hi)))
+        if exact:
+            ranges.append((lo, lo + 1, self._weight(1.0, lo, lo + 1)))
+        if not ranges:
+            ranges = [(i, i + 1, self._weight(FUZZY_WEIGHT * similarity, i, i + 1))
+                      for i, similarity in reversed(self._fuzzy(token, closed=not prefix))]
+        return sorted(ranges, key=lambda r: r[2])
+
+    def search(self, query, k=10, prefix=None):
+        """Top k foods for a query, best first.
+
+        With prefix left as None the last word is treated as unfinished unless the
+        query ends in a space, which is what type-ahead needs.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        if prefix is None:
+            prefix = not query[-1].isspace()
+
+        scores = np.zeros(self.foods, dtype=np.float32)
+        token_scores = np.empty(self.foods, dtype=np.float32)
+        for position, token in enumerate(tokens):
+            token_scores.fill(0)
+            for lo, hi, weight in self._ranges(token, prefix and position == len(tokens) - 1):
+                # Ranges come in ascending weight, so a food keeps its best match for this token
+                token_scores[self.postings[self.offsets[lo]:self.offsets[hi]]] = weight
+                head = (self.heads >= lo) & (self.heads < hi)
+                token_scores[head] = weight * (1 + HEAD_BONUS)
+            scores += token_scores
+
+        matched = np.flatnonzero(scores)
+        if not len(matched):
+            return []
+        ranked = scores[matched] - self.penalty[matched]
+        top = np.argpartition(-ranked, min(k, len(matched)) - 1)[:k] if len(matched) > k else np.arange(len(matched))
+        top = top[np.argsort(-ranked[top], kind="stable")]
+        return [Match(int(self.store.ndb_no[row]), self.store.descriptions[row].decode("utf-8"), float(ranked[i]))
+                for i, row in zip(top, matched[top])]
+
+
+def get_search_index():
+    """Return the process-wide index, building and saving it on first use"""
+    global _index
+    if _index is not None:
+        return _index
+
+    with _index_lock:
+        if _index is None:
+            store = get_nutrient_store()
+            index_path = os.path.join(store.path, f"search-v{INDEX_VERSION}")
+            if not os.path.isdir(index_path):
+                build_index(store, index_path)
+            _index = FoodSearchIndex(store, index_path)
+        return _index
+
+
+if __name__ == "__main__":
+    # Prebuild the index (e.g. in the image build) and optionally try a query
+    index = get_search_index()
+    for match in index.search(" ".join(sys.argv[1:])):
+        print(f"{match.ndb_no:>6}  {match.score:6.2f}  {match.description}")
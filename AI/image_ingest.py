@@ -0,0 +1,114 @@
+"""
+Bounded-memory ingestion of uploaded food photos.
+
+A phone photo is often 12 MP or more, which is about 36 MB once decoded,
+while recognition needs 224 x 224 and the page needs a few hundred pixels.
+ingest never holds more than the uploaded bytes plus a reduced decode:
+
+- The upload is hashed in chunks straight from the file object. Uploads over
+  FOOD_MAX_UPLOAD_MB are rejected before anything is decoded.
+- Image.open only parses the header. Dimensions over FOOD_MAX_IMAGE_PIXELS,
+  or over Pillow's own decompression bomb limit, are rejected, and the EXIF
+  orientation is read there too.
+- JPEGs are decoded in draft mode: libjpeg scales by 1/2, 1/4 or 1/8 while
+  decoding, to the smallest size that still covers the thumbnail. Other
+  formats have no reduced decode and are bounded by the pixel limit.
+
+The result is a display thumbnail and a normalized CHW float tensor in the
+classifier's input layout.
+"""
+import hashlib
+import os
+import warnings
+from typing import NamedTuple
+
+import numpy as np
+from PIL import Image, UnidentifiedImageError
+
+MAX_UPLOAD_BYTES = int(float(os.environ.get("FOOD_MAX_UPLOAD_MB", "20")) * 1024 * 1024)
+MAX_IMAGE_PIXELS = int(os.environ.get("FOOD_MAX_IMAGE_PIXELS", "50000000"))
+THUMBNAIL_SIZE = 512
+TENSOR_SIZE = 224
+
+EXIF_ORIENTATION = 0x0112
+_ORIENTATION_TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+_CHUNK_BYTES = 1 << 20
+
+# Pillow's own opener: importing ultralytics replaces Image.open with a wrapper
+# that answers any error, a decompression bomb included, by installing a HEIF
+# plugin and opening the file again
+_open_image = Image.open
+
+
+class ImageRejected(ValueError):
+    """The upload is too large or not a readable image"""
+
+
+class IngestedImage(NamedTuple):
+    key: str                 # SHA-256 of the uploaded bytes
+    tensor: np.ndarray       # (3, TENSOR_SIZE, TENSOR_SIZE) float32 RGB in [0, 1]
+    thumbnail: Image.Image   # upright, at most THUMBNAIL_SIZE on the long side
+    original_size: tuple     # (width, height) as stored, before orientation
+
+
+def _digest(file, max_bytes):
+    file.seek(0)
+    digest, size = hashlib.sha256(), 0
+    for chunk in iter(lambda: file.read(_CHUNK_BYTES), b""):
+        size += len(chunk)
+        if size > max_bytes:
+            raise ImageRejected(f"image is larger than {max_bytes / (1024 * 1024):.0f} MB")
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def to_tensor(image, size=TENSOR_SIZE):
+    """Resize the short side to size, center-crop and scale to [0, 1], as the classifier's transform does"""
+    width, height = image.size
+    scale = size / min(width, height)
+    resized = image.resize((max(size, round(width * scale)), max(size, round(height * scale))),
+                           Image.Resampling.BILINEAR)
+    left, top = (resized.width - size) // 2, (resized.height - size) // 2
+    cropped = resized.crop((left, top, left + size, top + size))
+    return np.asarray(cropped, dtype=np.float32).transpose(2, 0, 1) / 255
+
+
+def ingest(file, max_bytes=MAX_UPLOAD_BYTES, max_pixels=MAX_IMAGE_PIXELS,
+           thumbnail_size=THUMBNAIL_SIZE, tensor_size=TENSOR_SIZE):
+    """Read an uploaded image file object into an IngestedImage, decoding as little as possible"""
+    key = _digest(file, max_bytes)
+    try:
+        # Pillow refuses or warns about huge dimensions before we can check them
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", Image.DecompressionBombWarning)
+            image = _open_image(file)
+    except (Image.DecompressionBombError, Image.DecompressionBombWarning):
+        raise ImageRejected(f"image is over the {max_pixels / 1e6:.0f} MP limit") from None
+    except (UnidentifiedImageError, OSError) as exc:
+        raise ImageRejected(f"could not read the image: {exc}") from None
+
+    original_size = image.size
+    if image.width * image.height > max_pixels:
+        raise ImageRejected(f"image is {image.width} x {image.height}, over the {max_pixels / 1e6:.0f} MP limit")
+    orientation = image.getexif().get(EXIF_ORIENTATION, 1)
+
+    try:
+        # A no-op for formats other than JPEG
+        image.draft("RGB", (thumbnail_size, thumbnail_size))
+        image = image.convert("RGB")
+    except OSError as exc:
+        raise ImageRejected(f"could not decode the image: {exc}") from None
+
+    image.thumbnail((thumbnail_size, thumbnail_size), Image.Resampling.BILINEAR)
+    if orientation in _ORIENTATION_TRANSPOSE:
+        image = image.transpose(_ORIENTATION_TRANSPOSE[orientation])
+    return IngestedImage(key, to_tensor(image, tensor_size), image, original_size)
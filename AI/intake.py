@@ -0,0 +1,93 @@
+"""
+Vectorized nutrient totals for logged meals.
+
+A batch is three parallel arrays, one entry per logged food: who ate it, its
+NDB_No and the amount. Amounts are grams, or servings of the food's GmWt_1 /
+GmWt_2 household measure. An amount can also be an as-purchased weight,
+which is reduced by Refuse_Pct to the edible part that the food1.csv values
+(per 100 g edible portion) describe.
+
+Totals for every user come from one matrix product, grams per user and food
+times nutrients per gram, instead of a Python loop over users or entries. The
+nutrient rows are gathered from the memory-mapped store with fancy indexing
+over the distinct foods in the batch.
+"""
+from typing import NamedTuple
+
+import numpy as np
+
+from nutrient_store import get_nutrient_store
+
+# Measures an amount can be given in
+GRAMS, MEASURE_1, MEASURE_2 = 0, 1, 2
+_MEASURE_COLUMNS = {MEASURE_1: "GmWt_1", MEASURE_2: "GmWt_2"}
+
+# Upper bound on the users x foods gram matrix built per matrix product (float32 cells)
+MAX_BLOCK_CELLS = 1 << 24
+
+
+class IntakeTotals(NamedTuple):
+    users: np.ndarray    # distinct user ids, sorted
+    columns: list        # nutrient names, one per totals column
+    totals: np.ndarray   # users x columns
+
+    def for_user(self, user):
+        """Totals of one user as a dict"""
+        row = np.searchsorted(self.users, user)
+        if row == len(self.users) or self.users[row] != user:
+            raise KeyError(f"no intake logged for user {user!r}")
+        return dict(zip(self.columns, self.totals[row].tolist()))
+
+
+def edible_grams(ndb_nos, amounts, measures=GRAMS, as_purchased=False, store=None):
+    """Convert amounts to grams of edible portion.
+
+    measures and as_purchased may be scalars or arrays with one value per entry.
+    """
+    store = store or get_nutrient_store()
+    rows = store.rows(ndb_nos)
+    grams = np.asarray(amounts, dtype=np.float32).copy()
+    measures = np.broadcast_to(np.asarray(measures), grams.shape)
+
+    for measure, column in _MEASURE_COLUMNS.items():
+        selected = measures == measure
+        if selected.any():
+            weights = store.values[rows[selected], store.column_index(column)]
+            if (weights <= 0).any():
+                missing = np.unique(np.asarray(ndb_nos)[selected][weights <= 0]).tolist()
+                raise ValueError(f"foods have no {column} measure: {missing}")
+            grams[selected] *= weights
+    unknown = ~np.isin(measures, (GRAMS, *_MEASURE_COLUMNS))
+    if unknown.any():
+        raise ValueError(f"unknown measures: {np.unique(measures[unknown]).tolist()}")
+
+    as_purchased = np.broadcast_to(np.asarray(as_purchased, dtype=bool), grams.shape)
+    if as_purchased.any():
+        refuse = store.values[rows[as_purchased], store.column_index("Refuse_Pct")]
+        grams[as_purchased] *= 1 - refuse / 100
+    return grams
+
+
+def nutrient_totals(users, ndb_nos, grams, columns=None, store=None):
+    """Total nutrients per user for a batch of (user, NDB_No, grams of edible portion) entries"""
+    store = store or get_nutrient_store()
+    columns = list(columns or store.nutrient_columns)
+    grams = np.asarray(grams, dtype=np.float32)
+    if grams.shape != np.shape(users) or grams.shape != np.shape(ndb_nos):
+        raise ValueError("users, ndb_nos and grams must have the same length")
+
+    user_ids, user_index = np.unique(np.asarray(users), return_inverse=True)
+    rows, food_index = np.unique(store.rows(ndb_nos), return_inverse=True)
+    # food1.csv values are per 100 g
+    per_gram = store.values[np.ix_(rows, [store.column_index(name) for name in columns])] / 100
+
+    totals = np.empty((len(user_ids), len(columns)), dtype=np.float32)
+    block = max(1, MAX_BLOCK_CELLS // max(len(rows), 1))
+    for start in range(0, len(user_ids), block):
+        stop = min(start + block, len(user_ids))
+        in_block = (user_index >= start) & (user_index < stop)
+        # grams eaten per (user, food) in this block; repeated entries add up
+        cells = (user_index[in_block] - start) * len(rows) + food_index[in_block]
+        eaten = np.bincount(cells, weights=grams[in_block], minlength=(stop - start) * len(rows))
+        totals[start:stop] = eaten.reshape(stop - start, len(rows)).astype(np.float32) @ per_gram
+    return IntakeTotals(user_ids, columns, totals)
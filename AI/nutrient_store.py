@@ -0,0 +1,200 @@
+"""
+Read-only nutrient database over the USDA table in food1.csv.
+
+The CSV is parsed once and converted to NumPy .npy files: a float32 matrix
+of every numeric column, the NDB numbers, the descriptions and a dense
+NDB_No -> row index. The files are cached on disk under a key derived from
+the CSV's content hash, so an edited CSV is picked up automatically. They are
+opened memory-mapped, so every session in a process shares one store and
+every process shares the same page-cache pages instead of holding its own
+copy. A lookup by NDB_No is one array access.
+
+The CSV headers spell "µg" as a replacement character (e.g. "Selenium_(�g)",
+"Vit_D_�g") and some lack a parenthesis ("Copper_mg)"). Columns are exposed
+under normalized names such as "Selenium_(µg)" and "Copper_(mg)"; the
+original spellings are accepted as aliases.
+"""
+import csv
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+
+FOOD_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "food1.csv")
+CACHE_DIR = os.environ.get("NUTRIENT_CACHE_DIR") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), ".nutrient_cache")
+
+# Bump when the cached layout changes so old caches are not reused
+FORMAT_VERSION = 2
+
+ID_COLUMN = "NDB_No"
+DESCRIPTION_COLUMN = "Shrt_Desc"
+# Portion and waste columns that are stored with the nutrients but are not nutrients
+PORTION_COLUMNS = ("GmWt_1", "GmWt_2", "Refuse_Pct")
+
+_UNIT = re.compile(r"(?P<name>.*?)_?\(?(?P<unit>g|mg|µg)\)?")
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def normalize_header(header):
+    """Repair a food1.csv header: "Selenium_(�g)" -> "Selenium_(µg)", "Copper_mg)" -> "Copper_(mg)" """
+    name = header.replace("�", "µ").replace(" ", "")
+    match = _UNIT.fullmatch(name)
+    if match and match["name"]:
+        return f"{match['name']}_({match['unit']})"
+    return name
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _parse_float(value):
+    return float(value) if value.strip() else np.nan
+
+
+def build_cache(csv_path, cache_path):
+    """Parse the CSV and write the .npy files to cache_path atomically"""
+    with open(csv_path, newline="", encoding="utf-8", errors="replace") as f:
+        reader = csv.reader(f)
+        headers = next(reader)
+        rows = list(reader)
+
+    id_index, description_index = headers.index(ID_COLUMN), headers.index(DESCRIPTION_COLUMN)
+    numeric_indices = [i for i in range(len(headers)) if i not in (id_index, description_index)]
+    columns = [normalize_header(headers[i]) for i in numeric_indices]
+
+    ndb_no = np.array([int(float(row[id_index])) for row in rows], dtype=np.int32)
+    values = np.array([[_parse_float(row[i]) for i in numeric_indices] for row in rows], dtype=np.float32)
+    descriptions = np.array([row[description_index].encode("utf-8") for row in rows])
+
+    if len(np.unique(ndb_no)) != len(ndb_no):
+        raise ValueError(f"{csv_path}: duplicate {ID_COLUMN} values")
+    # Dense NDB_No -> row table; -1 marks numbers that are not in the table
+    index = np.full(int(ndb_no.max()) + 1, -1, dtype=np.int32)
+    index[ndb_no] = np.arange(len(ndb_no), dtype=np.int32)
+
+    write_arrays(cache_path, {"values": values, "ndb_no": ndb_no, "index": index, "descriptions": descriptions},
+                 {"columns": columns, "aliases": dict(zip((headers[i] for i in numeric_indices), columns))})
+
+
+def write_arrays(cache_path, arrays, meta):
+    """Save named arrays as .npy files plus meta.json into cache_path, atomically"""
+    # Write into a temporary directory and rename it, so concurrent builders never see partial files
+    parent = os.path.dirname(cache_path)
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=parent, prefix=".build-")
+    try:
+        for name, array in arrays.items():
+            np.save(os.path.join(staging, f"{name}.npy"), array)
+        with open(os.path.join(staging, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        try:
+            os.rename(staging, cache_path)
+        except OSError:
+            if not os.path.isdir(cache_path):
+                raise
+            # Another process finished the same cache first
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def load_arrays(cache_path, names):
+    """Memory-map the .npy files written by write_arrays; returns (arrays, meta)"""
+    with open(os.path.join(cache_path, "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    return {name: np.load(os.path.join(cache_path, f"{name}.npy"), mmap_mode="r") for name in names}, meta
+
+
+class NutrientStore:
+    """Memory-mapped, read-only view of the food table"""
+
+    def __init__(self, cache_path):
+        self.path = cache_path
+        arrays, meta = load_arrays(cache_path, ("values", "ndb_no", "descriptions", "index"))
+        self.columns = meta["columns"]
+        self.nutrient_columns = [name for name in self.columns if name not in PORTION_COLUMNS]
+        self._column_index = {name: i for i, name in enumerate(self.columns)}
+        self._column_index.update((alias, self._column_index[name]) for alias, name in meta["aliases"].items())
+
+        self.values = arrays["values"]
+        self.ndb_no = arrays["ndb_no"]
+        self.descriptions = arrays["descriptions"]
+        self._index = arrays["index"]
+
+    def __len__(self):
+        return len(self.ndb_no)
+
+    def __contains__(self, ndb_no):
+        return 0 <= ndb_no < len(self._index) and self._index[ndb_no] >= 0
+
+    def column_index(self, name):
+        """Position of a column by its normalized or original header"""
+        try:
+            return self._column_index[name]
+        except KeyError:
+            raise KeyError(f"unknown column {name!r}") from None
+
+    def row(self, ndb_no):
+        """Row of a food by NDB_No"""
+        ndb_no = int(ndb_no)
+        row = self._index[ndb_no] if 0 <= ndb_no < len(self._index) else -1
+        if row < 0:
+            raise KeyError(f"unknown {ID_COLUMN} {ndb_no}")
+        return int(row)
+
+    def rows(self, ndb_nos):
+        """Rows of many foods at once; raises KeyError if any is unknown"""
+        ndb_nos = np.asarray(ndb_nos, dtype=np.int64)
+        valid = (ndb_nos >= 0) & (ndb_nos < len(self._index))
+        rows = np.full(ndb_nos.shape, -1, dtype=np.int32)
+        rows[valid] = self._index[ndb_nos[valid]]
+        if (rows < 0).any():
+            raise KeyError(f"unknown {ID_COLUMN} values: {np.unique(ndb_nos[rows < 0]).tolist()}")
+        return rows
+
+    def description(self, ndb_no):
+        return self.descriptions[self.row(ndb_no)].decode("utf-8")
+
+    def value(self, ndb_no, column):
+        return float(self.values[self.row(ndb_no), self.column_index(column)])
+
+    def lookup(self, ndb_no):
+        """All columns of one food as a dict"""
+        row = self.row(ndb_no)
+        record = dict(zip(self.columns, self.values[row].tolist()))
+        record[ID_COLUMN] = int(self.ndb_no[row])
+        record[DESCRIPTION_COLUMN] = self.descriptions[row].decode("utf-8")
+        return record
+
+
+def cache_path_for(csv_path, cache_dir=CACHE_DIR):
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(cache_dir, f"{stem}-v{FORMAT_VERSION}-{file_digest(csv_path)[:16]}")
+
+
+def get_nutrient_store(csv_path=FOOD_CSV, cache_dir=CACHE_DIR):
+    """Return the process-wide store for a CSV, building its cache on first use"""
+    store = _stores.get(csv_path)
+    if store is not None:
+        return store
+
+    with _stores_lock:
+        store = _stores.get(csv_path)
+        if store is None:
+            cache_path = cache_path_for(csv_path, cache_dir)
+            if not os.path.isdir(cache_path):
+                build_cache(csv_path, cache_path)
+            store = NutrientStore(cache_path)
+            _stores[csv_path] = store
+        return store
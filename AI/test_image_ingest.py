@@ -0,0 +1,51 @@
+"""
+Upload limits of image_ingest.
+
+Run with: python -m pytest test_image_ingest.py
+"""
+import io
+import struct
+import zlib
+
+import pytest
+from PIL import Image
+
+from image_ingest import TENSOR_SIZE, ImageRejected, ingest
+
+
+def png_header(width, height):
+    """A PNG of a few dozen bytes that declares the given dimensions"""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    header = struct.pack(">IIBBBBB", width, height, 1, 0, 0, 0, 0)
+    return io.BytesIO(b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(b""))
+                      + chunk(b"IEND", b""))
+
+
+@pytest.mark.parametrize("width, height", [
+    (20000, 10000),  # Over Pillow's decompression bomb error limit
+    (10000, 10000),  # Over Pillow's warning limit only
+    (8000, 8000),    # Under Pillow's limits, over ours
+])
+def test_huge_dimensions_are_rejected(width, height):
+    with pytest.raises(ImageRejected, match="MP limit"):
+        ingest(png_header(width, height))
+
+
+def test_oversized_upload_is_rejected():
+    with pytest.raises(ImageRejected, match="larger than"):
+        ingest(io.BytesIO(b"\0" * 2048), max_bytes=1024)
+
+
+def test_unreadable_upload_is_rejected():
+    with pytest.raises(ImageRejected, match="could not read"):
+        ingest(io.BytesIO(b"not an image"))
+
+
+def test_photo_is_reduced_to_thumbnail_and_tensor():
+    upload = io.BytesIO()
+    Image.new("RGB", (1600, 1200), (200, 40, 40)).save(upload, "JPEG")
+    image = ingest(upload, thumbnail_size=256)
+    assert image.original_size == (1600, 1200)
+    assert max(image.thumbnail.size) <= 256
+    assert image.tensor.shape == (3, TENSOR_SIZE, TENSOR_SIZE)